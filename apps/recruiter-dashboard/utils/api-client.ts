@@ -28,6 +28,70 @@ export const apiClient = {
     }
   },
 
+  // Paginated search: the first page comes with a cursor for the next one
+  async searchApplicantsPaged(
+    query: string,
+    pageSize: number,
+    maxCandidates = 100
+  ): Promise<{ results: ApplicantType[]; next_cursor: string | null; total: number }> {
+    const response = await fetch(`${API_BASE_URL}/api/semantic-search`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ query, page_size: pageSize, max_candidates: maxCandidates })
+    });
+    if (!response.ok) throw new Error('Search failed');
+    return response.json();
+  },
+
+  // Next page of a paginated search (410 once the cursor has expired)
+  async nextSearchPage(
+    cursor: string
+  ): Promise<{ results: ApplicantType[]; next_cursor: string | null; total: number }> {
+    const response = await fetch(
+      `${API_BASE_URL}/api/semantic-search/page?cursor=${encodeURIComponent(cursor)}`
+    );
+    if (!response.ok) throw new Error('Failed to fetch search page');
+    return response.json();
+  },
+
+  // Run several searches in one request (results come back in query order)
+  async searchApplicantsBatch(queries: string[]): Promise<ApplicantType[][]> {
+    const response = await fetch(`${API_BASE_URL}/api/semantic-search/batch`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ queries, n_results: 10 })
+    });
+    if (!response.ok) throw new Error('Batch search failed');
+    const data = await response.json();
+    return data.results.map((entry: { results: ApplicantType[] }) => entry.results);
+  },
+
+  // Streaming search: onMessage gets each NDJSON line as it arrives
+  // ("candidates" first, then one "chunks" line per candidate, then "done")
+  async searchApplicantsStream(query: string, onMessage: (message: any) => void): Promise<void> {
+    const response = await fetch(`${API_BASE_URL}/api/semantic-search/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ query, n_results: 10 })
+    });
+    if (!response.ok || !response.body) throw new Error('Search failed');
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop() ?? '';
+      for (const line of lines) {
+        if (line.trim()) onMessage(JSON.parse(line));
+      }
+    }
+    if (buffer.trim()) onMessage(JSON.parse(buffer));
+  },
+
   // Get applicant details
   async getApplicant(id: string): Promise<ApplicantType> {
     const response = await fetch(`${API_BASE_URL}/api/applicants/${id}`);
@@ -1,11 +1,21 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import List, Optional
 import chromadb
 import json
 import os
+import time
 from sentence_transformers import SentenceTransformer
 from chunked_candidates_final import ChunkedCandidateDB
+from profile_stream import iter_profiles
+from embedding_snapshot import (attach_snapshot, build_snapshot, can_attach, file_sha1, load_snapshot,
+                                restore_snapshot, snapshot_exists, snapshot_lock)
+from bounded_executor import BoundedExecutor, Overloaded
+from result_pages import RankedResultStore, decode_cursor, slice_page
+from search_timing import StageHistograms, add_timing, server_timing_header
+from metrics import CONTENT_TYPE, Counter, Histogram, Registry
 import traceback
 
 app = FastAPI()
@@ -19,30 +29,269 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize database
-db = ChunkedCandidateDB()
+# Initialize database ("chroma" or "numpy", see ChunkedCandidateDB; the numpy
+# backend can keep vectors as float16 / int8 via VECTOR_DTYPE, and
+# COARSE_CANDIDATES > 0 turns on two-stage candidate -> chunk retrieval;
+# concurrent encodes are coalesced for up to EMBED_WAIT_MS into batches of
+# at most EMBED_BATCH_SIZE texts, see embedding_service.py)
+db = ChunkedCandidateDB(
+    backend=os.environ.get("VECTOR_BACKEND", "chroma"),
+    vector_dtype=os.environ.get("VECTOR_DTYPE", "float32"),
+    coarse_candidates=int(os.environ.get("COARSE_CANDIDATES", "0")),
+    embed_batch_size=int(os.environ.get("EMBED_BATCH_SIZE", "256")),
+    embed_wait_ms=float(os.environ.get("EMBED_WAIT_MS", "2"))
+)
+
+# Load candidates on startup: prefer the precomputed embedding snapshot
+# (see embedding_snapshot.py) and only fall back to encoding the corpus
+# when there is no snapshot or it was built from a different candidates.json.
+#
+# With the numpy float32 backend (and SHARED_INDEX not "0") the snapshot is
+# attached read-only instead of copied, so the workers of
+# `uvicorn api:app --workers N` share one copy of the chunk vectors, ids,
+# documents, metadata and BM25 postings through the page cache (the model
+# and the Python runtime are still loaded per worker; measurements in the
+# README). A missing or stale snapshot is then built first; snapshot_lock
+# makes one worker build it (or write the Chroma index) while the others
+# wait. Other backends and dtypes keep a private copy of the index in every
+# worker.
+CANDIDATES_PATH = os.environ.get("CANDIDATES_PATH", "candidates.json")
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "./snapshot")
+SHARED_INDEX = os.environ.get("SHARED_INDEX", "1") != "0"
+
+
+def load_fresh_snapshot():
+    snapshot = load_snapshot(SNAPSHOT_DIR) if snapshot_exists(SNAPSHOT_DIR) else None
+    if snapshot and snapshot[1].get("source_sha1") == file_sha1(CANDIDATES_PATH):
+        return snapshot
+    return None
+
 
-# Load candidates on startup
+startup_started = time.perf_counter()
+index_shared = False
 try:
-    print("Loading candidates data...")
-    with open('candidates.json', 'r') as f:
-        data = json.load(f)
-        candidates = data if isinstance(data, list) else data.get('profiles', [])
-    
-    print(f"Found {len(candidates)} candidates")
-    for candidate in candidates:
-        db._index_candidate(candidate)
-    print("Successfully loaded all candidates")
+    with snapshot_lock(SNAPSHOT_DIR):
+        snapshot = load_fresh_snapshot()
+        share = SHARED_INDEX and db.backend == "numpy" and db.vector_dtype == "float32"
+        if SHARED_INDEX and "SHARED_INDEX" in os.environ and not share:
+            print(f"Warning: SHARED_INDEX is set but the {db.backend} backend with {db.vector_dtype} "
+                  f"vectors cannot share the snapshot; each worker keeps its own copy of the index")
+        if share:
+            if snapshot is None or not can_attach(db, snapshot[1]):
+                print(f"Building embedding snapshot in {SNAPSHOT_DIR}...")
+                build_snapshot(db, CANDIDATES_PATH, SNAPSHOT_DIR)
+                snapshot = load_fresh_snapshot()
+        elif snapshot:
+            print(f"Loading embedding snapshot from {SNAPSHOT_DIR}...")
+            written = restore_snapshot(db, *snapshot)
+            print(f"Snapshot loaded ({written} chunks written to the index)")
+        else:
+            print("Loading candidates data...")
+            # Profiles are streamed from the file straight into batched ingest.
+            # prune_missing: candidates removed from the file leave the index too.
+            db.ingest_candidates(iter_profiles(CANDIDATES_PATH), prune_missing=True)
+            print("Successfully loaded all candidates")
+    if share:
+        # Outside the lock: attaching only maps files, and the per-worker
+        # keyword model can be built by all workers at once.
+        attached = attach_snapshot(db, *snapshot)
+        index_shared = True
+        print(f"Attached to embedding snapshot in {SNAPSHOT_DIR} ({attached} chunks, shared read-only)")
 except Exception as e:
     print(f"Error loading candidates: {str(e)}")
     raise
+startup_load_seconds = time.perf_counter() - startup_started
+
+# Searches are CPU-bound, so they run on a bounded thread pool instead of the
+# event loop; past SEARCH_WORKERS running + SEARCH_QUEUE waiting, new
+# searches are rejected with 503 instead of piling up.
+search_executor = BoundedExecutor(
+    max_workers=int(os.environ.get("SEARCH_WORKERS", "4")),
+    max_queue=int(os.environ.get("SEARCH_QUEUE", "16"))
+)
+
+@app.on_event("shutdown")
+def shutdown_search_executor():
+    search_executor.shutdown()
+
+# Prometheus metrics (GET /metrics). Request counters and latency histograms
+# are updated per request; index, cache, model and executor numbers are read
+# from their owners only when /metrics is scraped.
+registry = Registry()
+search_requests = registry.register(Counter(
+    "search_requests_total", "Search API requests by endpoint and HTTP status", ["endpoint", "status"]))
+search_latency = registry.register(Histogram(
+    "search_request_duration_seconds", "Search API request latency", ["endpoint"]))
+search_stage_latency = registry.register(Histogram(
+    "search_stage_duration_seconds", "Search latency by stage (see search_timing.py)", ["endpoint", "stage"]))
+# Embedding service batch sizes, queue waits and requests per kind
+for embedding_metric in db.embedder.metrics():
+    registry.register(embedding_metric)
+
+SEARCH_ENDPOINTS = {
+    "/api/semantic-search": "search",
+    "/api/semantic-search/page": "page",
+    "/api/semantic-search/stream": "stream",
+    "/api/semantic-search/batch": "batch",
+}
+
+@app.middleware("http")
+async def count_search_requests(request: Request, call_next):
+    endpoint = SEARCH_ENDPOINTS.get(request.url.path)
+    if endpoint is None:
+        return await call_next(request)
+    started = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        search_requests.inc(endpoint=endpoint, status=status)
+        search_latency.observe(time.perf_counter() - started, endpoint=endpoint)
+
+def collect_service_metrics():
+    index = db.index_stats()
+    cache = db.cache_stats()
+    load = search_executor.stats()
+    yield ("index_chunks", "gauge", "Chunks in the vector index", [("", {}, index["chunks"])])
+    yield ("index_candidates", "gauge", "Candidates with at least one chunk", [("", {}, index["candidates"])])
+    yield ("index_version", "gauge", "Writes applied to the index", [("", {}, db.index_version)])
+    yield ("startup_load_seconds", "gauge", "Time to load the index at startup (snapshot or ingest)",
+           [("", {}, startup_load_seconds)])
+    yield ("index_shared", "gauge", "1 if the index is attached read-only to the shared snapshot files",
+           [("", {}, int(index_shared))])
+    if db.last_ingest:
+        yield ("ingest_last_duration_seconds", "gauge", "Wall time of the last ingest",
+               [("", {}, db.last_ingest["seconds"])])
+        yield ("ingest_last_chunks_per_second", "gauge", "Chunk throughput of the last ingest",
+               [("", {}, db.last_ingest["chunks_per_sec"])])
+    encode = db.encode_stats()
+    yield ("model_encode_seconds_total", "counter", "Time spent in encode requests (queue wait + inference)",
+           [("", {"kind": kind}, stats["seconds"]) for kind, stats in encode.items()])
+    yield ("model_encode_calls_total", "counter", "Encode requests",
+           [("", {"kind": kind}, stats["calls"]) for kind, stats in encode.items()])
+    yield ("model_encoded_texts_total", "counter", "Texts encoded by the model",
+           [("", {"kind": kind}, stats["texts"]) for kind, stats in encode.items()])
+    yield ("search_cache_hits_total", "counter", "Query embedding / search result cache hits",
+           [("", {"cache": "embedding"}, cache["embedding_hits"]), ("", {"cache": "result"}, cache["result_hits"])])
+    yield ("search_cache_misses_total", "counter", "Query embedding / search result cache misses",
+           [("", {"cache": "embedding"}, cache["embedding_misses"]), ("", {"cache": "result"}, cache["result_misses"])])
+    yield ("search_cache_entries", "gauge", "Entries in the query embedding / search result caches",
+           [("", {"cache": "embedding"}, cache["embedding_cache_size"]), ("", {"cache": "result"}, cache["result_cache_size"])])
+    yield ("search_executor_in_flight", "gauge", "Searches running on the search executor", [("", {}, load["in_flight"])])
+    yield ("search_executor_queued", "gauge", "Searches waiting for a search worker", [("", {}, load["queued"])])
+    yield ("search_executor_rejected_total", "counter", "Searches rejected with 503", [("", {}, load["rejected"])])
+
+registry.add_collector(collect_service_metrics)
+
+# Rolling per-stage latency samples of completed searches, per endpoint
+# (GET /api/search-timings)
+stage_histograms = {"search": StageHistograms(), "stream": StageHistograms(), "batch": StageHistograms()}
+
+def record_timings(endpoint: str, response: Response, timings, submitted: float):
+    add_timing(timings, "total", submitted)
+    response.headers["Server-Timing"] = server_timing_header(timings)
+    stage_histograms[endpoint].observe(timings)
+    for stage, ms in timings.items():
+        search_stage_latency.observe(ms / 1000.0, endpoint=endpoint, stage=stage)
+
+# Ranked candidate lists behind pagination cursors (see result_pages.py).
+# They are kept in this worker unless CURSOR_DIR names a directory shared by
+# all workers; with `--workers N` set it, or a cursor paged on a different
+# worker than the one that issued it answers 410.
+#
+# Everything else here is per worker as well: the query / result caches,
+# /api/search-timings and /metrics describe only the worker that answered
+# (scrape every worker, or run one worker, for whole-service numbers).
+result_store = RankedResultStore(
+    ttl_seconds=float(os.environ.get("CURSOR_TTL_SECONDS", "300")),
+    directory=os.environ.get("CURSOR_DIR") or None
+)
 
 class SearchQuery(BaseModel):
     query: str
     n_results: int = 400
+    # Candidates kept per subquery, and (if set) how many go on each page.
+    max_candidates: int = 15
+    page_size: Optional[int] = None
+    # Adds per-stage timings (ms) to the response as debug.timings
+    debug: bool = False
 
 @app.post("/api/semantic-search")
-async def semantic_search(search_query: SearchQuery):
+async def semantic_search(search_query: SearchQuery, response: Response):
+    if search_query.page_size is not None and search_query.page_size <= 0:
+        raise HTTPException(status_code=422, detail="page_size must be positive")
+    timings = {}
+    submitted = time.perf_counter()
+    try:
+        body = await search_executor.run(run_semantic_search, search_query, timings, submitted)
+    except Overloaded as e:
+        print(f"Search rejected: {str(e)}")
+        raise HTTPException(status_code=503, detail="Search service is busy, retry shortly",
+                            headers={"Retry-After": "1"})
+    record_timings("search", response, timings, submitted)
+    if search_query.debug:
+        body["debug"] = {"timings": timings}
+    return body
+
+def format_result(result):
+    """Shapes one multi_subquery_search candidate for the dashboard."""
+    sections = {}
+    relevant_chunks = []
+
+    # Format chunks exactly like terminal output
+    for subq_idx, (score, chunk_info) in enumerate(result['chosen_subchunks']):
+        if not chunk_info.get('section'):
+            # No unused chunk was left for this subquery (an empty dict)
+            continue
+        section = chunk_info['section'].lower()
+        if section not in sections:
+            sections[section] = []
+        sections[section].append(chunk_info['snippet'])
+
+        # Format chunk like terminal output
+        chunk_text = (
+            f"(score={score:.3f}, section={chunk_info['section']}):\n"
+            f"{chunk_info['snippet']}"
+        )
+
+        relevant_chunks.append({
+            'score': score,
+            'content': chunk_info['snippet'],
+            'section': section,
+            'formatted_text': chunk_text,
+            'subquery_index': subq_idx + 1
+        })
+
+    return {
+        'candidate_id': result['candidate_id'],
+        'candidate_name': result['candidate_name'],
+        'score': abs(float(result['score'])),
+        'sections': {
+            'education': sections.get('education', []),
+            'experience': sections.get('experience', []),
+            'publications': sections.get('publications', []),
+            'projects': sections.get('projects', []),
+            'awards': sections.get('awards', [])
+        },
+        'relevantChunks': relevant_chunks
+    }
+
+def rank_results(results):
+    # Sort by score in descending order
+    return sorted(results, key=lambda result: abs(float(result['score'])), reverse=True)
+
+def format_results(results):
+    """Shapes multi_subquery_search results for the dashboard, best score first."""
+    return [format_result(result) for result in rank_results(results)]
+
+def run_semantic_search(search_query: SearchQuery, timings=None, submitted: float = None):
+    if timings is None:
+        timings = {}
+    if submitted is not None:
+        # Time spent waiting for a search worker
+        add_timing(timings, "queue", submitted)
     try:
         print(f"\n=== New Search Request ===")
         print(f"Query: '{search_query.query}'")
@@ -53,66 +302,199 @@ async def semantic_search(search_query: SearchQuery):
         # Use the same search function as terminal
         results = db.multi_subquery_search(
             query,
-            search_query.n_results
+            search_query.n_results,
+            timings,
+            max_candidates=search_query.max_candidates
         )
-        
-        formatted_results = []
-        for result in results:
-            sections = {}
-            relevant_chunks = []
-            
-            # Format chunks exactly like terminal output
-            for subq_idx, (score, chunk_info) in enumerate(result['chosen_subchunks']):
-                section = chunk_info['section'].lower()
-                if section not in sections:
-                    sections[section] = []
-                sections[section].append(chunk_info['snippet'])
-                
-                # Format chunk like terminal output
-                chunk_text = (
-                    f"(score={score:.3f}, section={chunk_info['section']}):\n"
-                    f"{chunk_info['snippet']}"
-                )
-                
-                relevant_chunks.append({
-                    'score': score,
-                    'content': chunk_info['snippet'],
-                    'section': section,
-                    'formatted_text': chunk_text,
-                    'subquery_index': subq_idx + 1
-                })
-
-            formatted_result = {
-                'candidate_id': result['candidate_id'],
-                'candidate_name': result['candidate_name'],
-                'score': abs(float(result['score'])),
-                'sections': {
-                    'education': sections.get('education', []),
-                    'experience': sections.get('experience', []),
-                    'publications': sections.get('publications', []),
-                    'projects': sections.get('projects', []),
-                    'awards': sections.get('awards', [])
-                },
-                'relevantChunks': relevant_chunks
-            }
-            formatted_results.append(formatted_result)
-        
-        # Sort by score in descending order
-        formatted_results.sort(key=lambda x: x['score'], reverse=True)
+
+        started = time.perf_counter()
+        response = {}
+        if search_query.page_size:
+            # Keep the whole ranked list server-side; this and later pages are slices of it.
+            ranked = rank_results(results)
+            token = result_store.put(ranked)
+            page, next_cursor = slice_page(token, ranked, 0, search_query.page_size)
+            formatted_results = [format_result(result) for result in page]
+            response = {"next_cursor": next_cursor, "total": len(ranked)}
+        else:
+            formatted_results = format_results(results)
+        add_timing(timings, "format", started)
         
         # Debug output
+        started = time.perf_counter()
         print(f"\nFound {len(formatted_results)} matching candidates")
         for i, result in enumerate(formatted_results, 1):
             print(f"{i}. {result['candidate_name']} (score: {result['score']:.3f})")
             for chunk in result['relevantChunks']:
                 print(f"   {chunk['formatted_text']}\n")
+        add_timing(timings, "log", started)
         
-        return {"results": formatted_results}
+        return {"results": formatted_results, **response}
     except Exception as e:
         print(f"Search error: {str(e)}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/semantic-search/page")
+def semantic_search_page(cursor: str):
+    # Later pages of a paginated search: a slice of the stored ranked list,
+    # no encoding or vector query. A plain def, so FastAPI runs it on its
+    # threadpool: with CURSOR_DIR the store reads files, which must not block
+    # the event loop. (The first page's put() runs on the search executor.)
+    try:
+        token, offset, page_size = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ranked = result_store.get(token)
+    if ranked is None:
+        raise HTTPException(status_code=410, detail="Cursor expired, run the search again")
+    page, next_cursor = slice_page(token, ranked, offset, page_size)
+    return {
+        "results": [format_result(result) for result in page],
+        "next_cursor": next_cursor,
+        "total": len(ranked)
+    }
+
+@app.post("/api/semantic-search/stream")
+async def semantic_search_stream(search_query: SearchQuery):
+    """
+    Same search as /api/semantic-search, streamed as NDJSON so the dashboard
+    can render before formatting finishes:
+      {"type": "candidates", "results": [{rank, candidate_id, candidate_name, score}, ...]}
+      {"type": "chunks", "rank", "candidate_id", "sections", "relevantChunks"}  (one per candidate)
+      {"type": "done", "count"}
+    """
+    timings = {}
+    submitted = time.perf_counter()
+    try:
+        results = await search_executor.run(
+            db.multi_subquery_search, search_query.query.strip(), search_query.n_results, timings,
+            max_candidates=search_query.max_candidates
+        )
+    except Overloaded as e:
+        print(f"Search rejected: {str(e)}")
+        raise HTTPException(status_code=503, detail="Search service is busy, retry shortly",
+                            headers={"Retry-After": "1"})
+    except Exception as e:
+        print(f"Search error: {str(e)}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+    # Timings cover the search up to the first line; formatting happens while streaming.
+    response = StreamingResponse(stream_results(rank_results(results)), media_type="application/x-ndjson")
+    record_timings("stream", response, timings, submitted)
+    return response
+
+def stream_results(ranked):
+    yield json.dumps({
+        "type": "candidates",
+        "results": [
+            {
+                'rank': rank,
+                'candidate_id': result['candidate_id'],
+                'candidate_name': result['candidate_name'],
+                'score': abs(float(result['score']))
+            }
+            for rank, result in enumerate(ranked, 1)
+        ]
+    }) + "\n"
+    try:
+        # Chunk snippets are formatted one candidate at a time as the client reads.
+        for rank, result in enumerate(ranked, 1):
+            formatted = format_result(result)
+            yield json.dumps({
+                "type": "chunks",
+                "rank": rank,
+                "candidate_id": formatted['candidate_id'],
+                "sections": formatted['sections'],
+                "relevantChunks": formatted['relevantChunks']
+            }) + "\n"
+    except Exception as e:
+        # Headers are already sent, so errors are reported in-band.
+        print(f"Search stream error: {str(e)}")
+        traceback.print_exc()
+        yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+        return
+    yield json.dumps({"type": "done", "count": len(ranked)}) + "\n"
+
+# Saved-search refreshes send many queries at once; all of their subqueries
+# are encoded in one model call (see multi_subquery_search_batch).
+MAX_BATCH_QUERIES = int(os.environ.get("MAX_BATCH_QUERIES", "64"))
+
+class BatchSearchQuery(BaseModel):
+    queries: List[str]
+    n_results: int = 400
+    max_candidates: int = 15
+    debug: bool = False
+
+@app.post("/api/semantic-search/batch")
+async def semantic_search_batch(batch_query: BatchSearchQuery, response: Response):
+    if len(batch_query.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_QUERIES} queries per batch")
+    timings = {}
+    submitted = time.perf_counter()
+    try:
+        body = await search_executor.run(run_semantic_search_batch, batch_query, timings, submitted)
+    except Overloaded as e:
+        print(f"Batch search rejected: {str(e)}")
+        raise HTTPException(status_code=503, detail="Search service is busy, retry shortly",
+                            headers={"Retry-After": "1"})
+    record_timings("batch", response, timings, submitted)
+    if batch_query.debug:
+        body["debug"] = {"timings": timings}
+    return body
+
+def format_batch_entry(query, query_results):
+    # A query that fails to format is reported on its own entry; the other
+    # queries of the batch still get their results.
+    try:
+        return {"query": query, "results": format_results(query_results)}
+    except Exception as e:
+        print(f"Batch search error for '{query}': {str(e)}")
+        traceback.print_exc()
+        return {"query": query, "results": [], "error": str(e)}
+
+def run_semantic_search_batch(batch_query: BatchSearchQuery, timings=None, submitted: float = None):
+    if timings is None:
+        timings = {}
+    if submitted is not None:
+        add_timing(timings, "queue", submitted)
+    try:
+        print(f"\n=== New Batch Search Request ({len(batch_query.queries)} queries) ===")
+        queries = [q.strip() for q in batch_query.queries]
+        results = db.multi_subquery_search_batch(
+            queries, batch_query.n_results, timings, max_candidates=batch_query.max_candidates
+        )
+        started = time.perf_counter()
+        body = {"results": [format_batch_entry(query, query_results)
+                            for query, query_results in zip(batch_query.queries, results)]}
+        add_timing(timings, "format", started)
+        return body
+    except Exception as e:
+        print(f"Batch search error: {str(e)}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/cache-stats")
+async def cache_stats():
+    # Query embedding / search result cache hit and miss counters
+    return db.cache_stats()
+
+@app.get("/api/search-timings")
+async def search_timings():
+    # Per-stage latency percentiles and buckets over the recent searches of each endpoint
+    return {endpoint: histograms.snapshot() for endpoint, histograms in stage_histograms.items()}
+
+@app.get("/metrics")
+def metrics():
+    # Plain def: runs in the threadpool, so an index recount after writes
+    # does not block the event loop.
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+@app.get("/api/search-load")
+async def search_load():
+    # Running / queued / rejected searches of the bounded search executor
+    return search_executor.stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict
+
+###############################################################################
+# Bounded executor for blocking search work
+#
+# Runs blocking calls (model encoding, vector queries, TF-IDF fitting) on a
+# fixed pool of threads so they never block the event loop. At most
+# max_workers calls run and at most max_queue wait; anything beyond that is
+# rejected right away with Overloaded instead of queueing without limit.
+# A slot is released when the call actually finishes, not when the awaiting
+# request goes away, so abandoned work still counts against the limit.
+###############################################################################
+
+
+class Overloaded(Exception):
+    """Raised when the executor already has max_workers + max_queue calls."""
+
+
+class BoundedExecutor:
+    def __init__(self, max_workers: int = 4, max_queue: int = 16):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._rejected = 0
+        self._completed = 0
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise Overloaded(f"{self._pending} searches in progress or queued")
+            self._pending += 1
+        future = self._executor.submit(partial(fn, *args, **kwargs))
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": min(self._pending, self.max_workers),
+                "queued": max(self._pending - self.max_workers, 0),
+                "rejected": self._rejected,
+                "completed": self._completed,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,132 @@
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from numpy_index import NumpyCollection, _normalize
+
+###############################################################################
+# Candidate-level vectors for two-stage retrieval
+#
+# CandidateIndex pools the chunk vectors of each candidate, one entry per
+# (candidate, section), into a small NumpyCollection:
+#   pooling="mean"  normalized centroid of the chunk vectors
+#   pooling="max"   normalized element-wise max of the chunk vectors
+# A coarse search over these entries shortlists candidates, and only the
+# shortlisted candidates' chunks are then scored. Keeping one entry per
+# section means a section filter still applies in the coarse pass.
+#
+# Writes only mark the touched candidates dirty; refresh() re-pools them
+# from the chunk collection in one get() before the next search.
+###############################################################################
+
+# Candidates re-pooled per collection.get() call during refresh.
+_REFRESH_BATCH = 512
+
+
+def _entry_id(candidate_id: str, section: str) -> str:
+    return f"{candidate_id}::{section}"
+
+
+class CandidateIndex:
+    def __init__(self, pooling: str = "mean", vector_dtype: str = "float32"):
+        if pooling not in ("mean", "max"):
+            raise ValueError(f"Unknown candidate pooling: {pooling}")
+        self.pooling = pooling
+        self._vector_dtype = vector_dtype
+        self.vectors = NumpyCollection(vector_dtype=vector_dtype)
+        self.loaded = False
+        self._candidate_of: Dict[str, str] = {}
+        self._entries: Dict[str, Set[str]] = {}
+        self._sections: Set[str] = set()
+        self._dirty: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, chunk_ids: Iterable[str], metadatas: Iterable[Dict[str, Any]]) -> None:
+        for chunk_id, metadata in zip(chunk_ids, metadatas):
+            candidate_id = (metadata or {}).get("candidate_id", "Unknown")
+            self._candidate_of[chunk_id] = candidate_id
+            self._dirty.add(candidate_id)
+
+    def remove(self, chunk_ids: Iterable[str]) -> None:
+        for chunk_id in chunk_ids:
+            candidate_id = self._candidate_of.pop(chunk_id, None)
+            if candidate_id is not None:
+                self._dirty.add(candidate_id)
+
+    def refresh(self, collection) -> None:
+        """
+        Brings the pooled vectors in line with `collection`: everything on the
+        first call, afterwards only the candidates written since the last one.
+        """
+        if not self.loaded:
+            stored = collection.get(include=["metadatas", "embeddings"])
+            self.vectors = NumpyCollection(vector_dtype=self._vector_dtype)
+            self._candidate_of.clear()
+            self._entries.clear()
+            self._sections.clear()
+            self._dirty.clear()
+            self._pool(stored, None)
+            self.loaded = True
+            return
+        dirty = sorted(self._dirty)
+        self._dirty.clear()
+        for start in range(0, len(dirty), _REFRESH_BATCH):
+            batch = dirty[start:start + _REFRESH_BATCH]
+            stored = collection.get(where={"candidate_id": {"$in": batch}}, include=["metadatas", "embeddings"])
+            self._pool(stored, batch)
+
+    def _pool(self, stored: Dict[str, Any], candidate_ids: Optional[List[str]]) -> None:
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        for row, (chunk_id, metadata) in enumerate(zip(stored["ids"], stored["metadatas"])):
+            candidate_id = metadata.get("candidate_id", "Unknown")
+            self._candidate_of[chunk_id] = candidate_id
+            groups.setdefault((candidate_id, metadata.get("section", "")), []).append(row)
+
+        if candidate_ids is not None:
+            stale = [e for c in candidate_ids for e in self._entries.pop(c, ())]
+            self.vectors.delete(stale)
+        if not groups:
+            return
+
+        vectors = _normalize(stored["embeddings"])
+        keys = list(groups)
+        if self.pooling == "max":
+            pooled = np.stack([vectors[groups[key]].max(axis=0) for key in keys])
+        else:
+            pooled = np.stack([vectors[groups[key]].mean(axis=0) for key in keys])
+        ids = [_entry_id(c, s) for c, s in keys]
+        self.vectors.upsert(
+            ids=ids,
+            embeddings=pooled,
+            metadatas=[{"candidate_id": c, "section": s} for c, s in keys]
+        )
+        for (candidate_id, section), entry in zip(keys, ids):
+            self._entries.setdefault(candidate_id, set()).add(entry)
+            self._sections.add(section)
+
+    def shortlist(self, query_embeddings: np.ndarray, n_candidates: int,
+                  sections: Optional[List[str]] = None) -> List[List[str]]:
+        """
+        Top `n_candidates` candidate ids per query by their best pooled entry,
+        restricted to entries of `sections` if given.
+        """
+        where = None
+        per_candidate = len(self._sections)
+        if sections is not None:
+            where = {"section": {"$in": list(sections)}}
+            per_candidate = len(sections)
+        # A candidate has at most one entry per section, so this many entries
+        # always cover n_candidates distinct candidates when they exist.
+        results = self.vectors.query(
+            query_embeddings=query_embeddings,
+            n_results=n_candidates * max(per_candidate, 1),
+            where=where,
+            include=["metadatas"]
+        )
+        shortlists = []
+        for metadatas in results["metadatas"]:
+            candidates = dict.fromkeys(m["candidate_id"] for m in metadatas)
+            shortlists.append(list(candidates)[:n_candidates])
+        return shortlists
@@ -1,9 +1,14 @@
 import json
 import os
 import sys
-from datetime import datetime
-from typing import Dict, List, Any, Tuple
+import hashlib
+import copy
+import multiprocessing
+import threading
+import time
+from typing import Dict, Iterable, List, Any, Tuple
 import re
+from collections import OrderedDict, deque
 
 import chromadb
 from chromadb.config import Settings
@@ -12,7 +17,17 @@ import numpy as np
 import pandas as pd
 import plotly.express as px
 from numpy.linalg import norm
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, TfidfVectorizer
+
+from candidate_index import CandidateIndex
+from embedding_service import EmbeddingService
+from keyword_index import InvertedIndex, tokenize
+from numpy_index import NumpyCollection
+from partitioned_index import PartitionedCollection
+from profile_stream import iter_profiles
+from search_timing import add_timing
+
+MODEL_NAME = "all-MiniLM-L6-v2"
 
 ###############################################################################
 # 1) Basic text utilities
@@ -21,6 +36,35 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 def cosine_similarity(a, b):
     return np.dot(a, b) / (norm(a) * norm(b))
 
+def normalize_query(text: str) -> str:
+    """Cache key form of a query: lowercased, whitespace collapsed."""
+    return " ".join(text.lower().split())
+
+def chunk_id(candidate_id: str, section: str, index: int, text: str, metadata: Dict[str, Any] = None) -> str:
+    """
+    Stable chunk id: the same candidate/section/entry/text/metadata always
+    maps to the same id, so re-ingesting unchanged profiles is a no-op. The
+    metadata is part of the hash so that a changed candidate name (which
+    leaves the chunk text alone) still replaces the stored chunk.
+    """
+    content = text + "\x00" + json.dumps(metadata or {}, sort_keys=True, default=str)
+    digest = hashlib.sha1(content.encode("utf-8")).hexdigest()[:12]
+    return f"{candidate_id}-{section}-{index}-{digest}"
+
+def add_section_filter(filters: Dict[str, Any], section: str) -> None:
+    """
+    Adds `section` to filters["section"]. Several sections are kept as a list
+    and mean "any of these" instead of the last one silently winning.
+    """
+    current = filters.get("section")
+    if current is None:
+        filters["section"] = section
+    elif isinstance(current, list):
+        if section not in current:
+            current.append(section)
+    elif current != section:
+        filters["section"] = [current, section]
+
 def naive_query_parser(user_input: str) -> Tuple[str, Dict[str, str]]:
     """
     Very naive parser: remove certain words for semantic weighting,
@@ -31,7 +75,7 @@ def naive_query_parser(user_input: str) -> Tuple[str, Dict[str, str]]:
 
     # If user mentions publications
     if "publications" in text or "publication" in text or 'published' in text or 'paper' in text:
-        filters["section"] = "publication"
+        add_section_filter(filters, "publication")
         text = text.replace("publications", "")
         text = text.replace("publication", "")
 
@@ -62,7 +106,7 @@ def parse_subquery_for_filters(sub_text: str) -> Tuple[str, Dict[str, Any]]:
 
     # For example, look for 'industry'
     if 'industry' in sub_text:
-        sub_filters["section"] = "experience"
+        add_section_filter(sub_filters, "experience")
         # remove the word 'industry' so it doesn't overly bias semantic part
         sub_text = sub_text.replace("industry", "")
     
@@ -75,12 +119,12 @@ def parse_subquery_for_filters(sub_text: str) -> Tuple[str, Dict[str, Any]]:
     # If subquery includes 'student', it's often about education
     # We can guess they want 'section=education'
     if "student" in sub_text:
-        sub_filters["section"] = "education"
+        add_section_filter(sub_filters, "education")
         sub_text = sub_text.replace("student", "")
     
     # If user mentions publications
     if "publications" in sub_text or "publication" in sub_text or 'published' in sub_text:
-        sub_filters["section"] = "publication"
+        add_section_filter(sub_filters, "publication")
         sub_text = sub_text.replace("publications", "")
         sub_text = sub_text.replace("publication", "")
 
@@ -104,7 +148,10 @@ def parse_subquery_for_filters(sub_text: str) -> Tuple[str, Dict[str, Any]]:
     # Merge old_filters into sub_filters
     # (old_filters might set section=publication if 'publication' is in sub-text)
     for k, v in old_filters.items():
-        sub_filters[k] = v
+        if k == "section":
+            add_section_filter(sub_filters, v)
+        else:
+            sub_filters[k] = v
 
     return semantic_part.strip(), sub_filters
 
@@ -114,10 +161,116 @@ def parse_subquery_for_filters(sub_text: str) -> Tuple[str, Dict[str, Any]]:
 ###############################################################################
 
 class ChunkedCandidateDB:
-    def __init__(self, persist_directory: str = "./chroma_db"):
-        self.client = chromadb.Client()
-        self.collection = self.client.get_or_create_collection(name="candidate_chunks")
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
+    def __init__(self, persist_directory: str = "./chroma_db", backend: str = "chroma",
+                 partition_by_section: bool = True, retrieval: str = "hybrid",
+                 fusion: str = "weighted", bm25_weight: float = 0.2, vector_dtype: str = "float32",
+                 coarse_candidates: int = 0, candidate_pooling: str = "mean",
+                 query_cache_size: int = 1024, result_cache_size: int = 256,
+                 embed_batch_size: int = 256, embed_wait_ms: float = 2.0):
+        """
+        backend="chroma" stores chunks in Chroma collections (persisted under
+        persist_directory; None keeps the old throwaway in-memory index).
+        backend="numpy" keeps them in an in-process NumpyCollection with exact
+        search; it is not persisted, so pair it with an embedding snapshot.
+        vector_dtype ("float32", "float16" or "int8") sets how the numpy
+        backend stores chunk vectors; Chroma always stores float32.
+        partition_by_section keeps one sub-index per chunk section so section
+        filters only search the matching partitions (see partitioned_index.py).
+        With Chroma it also keeps the unpartitioned "candidate_chunks"
+        collection for unfiltered queries, which doubles index storage.
+        retrieval="hybrid" runs a BM25 leg next to the dense search and fuses
+        the two ("weighted": similarity + bm25_weight * normalized BM25, or
+        "rrf": reciprocal-rank fusion); retrieval="dense" keeps the flat
+        TF-IDF keyword bonus on dense hits only.
+        coarse_candidates > 0 turns on two-stage retrieval: a search over
+        pooled per-candidate vectors (candidate_pooling "mean" or "max", see
+        candidate_index.py) shortlists that many candidates, and only their
+        chunks are scored.
+        query_cache_size / result_cache_size bound the LRU caches of query
+        embeddings and multi_subquery_search results (0 disables a cache).
+        All query and ingest encoding goes through one EmbeddingService
+        (embedding_service.py), which coalesces concurrent requests for up to
+        embed_wait_ms into model calls of at most embed_batch_size texts.
+        Chroma collections are opened without an embedding function, so
+        Chroma never loads a second copy of the model.
+        """
+        if retrieval not in ("dense", "hybrid"):
+            raise ValueError(f"Unknown retrieval mode: {retrieval}")
+        if fusion not in ("weighted", "rrf"):
+            raise ValueError(f"Unknown fusion method: {fusion}")
+        self.retrieval = retrieval
+        self.fusion = fusion
+        self.bm25_weight = bm25_weight
+        self.coarse_candidates = coarse_candidates
+        self.backend = backend
+        self.vector_dtype = vector_dtype
+        if backend != "numpy" and vector_dtype != "float32":
+            raise ValueError(f"vector_dtype={vector_dtype} is only supported by the numpy backend")
+        if backend == "chroma":
+            if persist_directory:
+                self.client = chromadb.PersistentClient(path=persist_directory)
+            else:
+                self.client = chromadb.Client()
+            if partition_by_section:
+                prefix = "candidate_chunks_"
+                existing = [getattr(c, "name", c) for c in self.client.list_collections()]
+                self.collection = PartitionedCollection(
+                    lambda section: self.client.get_or_create_collection(name=prefix + section, embedding_function=None),
+                    [name[len(prefix):] for name in existing if name.startswith(prefix)],
+                    full_index=self.client.get_or_create_collection(name="candidate_chunks", embedding_function=None)
+                )
+                # "candidate_chunks" may still hold an index from before partitioning.
+                deleted, copied = self.collection.sync_full_index()
+                if deleted or copied:
+                    print(f"Synced the unpartitioned index with the section partitions "
+                          f"({deleted} stale chunks removed, {copied} copied)")
+            else:
+                self.collection = self.client.get_or_create_collection(name="candidate_chunks", embedding_function=None)
+        elif backend == "numpy":
+            self.client = None
+            if partition_by_section:
+                self.collection = PartitionedCollection(lambda section: NumpyCollection(vector_dtype=vector_dtype))
+            else:
+                self.collection = NumpyCollection(vector_dtype=vector_dtype)
+        else:
+            raise ValueError(f"Unknown vector backend: {backend}")
+        self.model = SentenceTransformer(MODEL_NAME)
+        self.embedder = EmbeddingService(self.model, embed_batch_size, embed_wait_ms)
+
+        # Bumped on every write to the collection; derived structures such as
+        # the TF-IDF keyword model remember the version they were built from.
+        self.index_version = 0
+        self._tfidf_vectorizer = None
+        self._tfidf_features = None
+        self._tfidf_version = -1
+        # Term -> chunk ids, kept in step with every write once it has been
+        # loaded (a persisted collection is indexed on first use).
+        self.keyword_index = InvertedIndex()
+        self._keyword_index_loaded = False
+        # Pooled candidate vectors for the coarse pass, re-pooled for the
+        # candidates touched by writes (loaded on first use, like the above).
+        self.candidate_index = CandidateIndex(candidate_pooling, vector_dtype)
+
+        # LRU caches: normalized query text -> embedding, and
+        # (normalized query, n_results, max_candidates, index_version) -> search results.
+        # Results are keyed on index_version, so a write makes them unreachable.
+        self.query_cache_size = query_cache_size
+        self.result_cache_size = result_cache_size
+        self._embedding_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._result_cache: "OrderedDict[Tuple[str, int, int, int], List[Dict[str, Any]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Serializes lazy rebuilds of derived indexes when searches run on
+        # several threads.
+        self._refresh_lock = threading.RLock()
+        self._cache_counters = {"embedding_hits": 0, "embedding_misses": 0, "result_hits": 0, "result_misses": 0}
+
+        # Encode request totals per kind ("query" / "ingest"), the
+        # stats of the last ingest, and (chunk, candidate) counts cached per
+        # index_version; read by monitoring (see api.py /metrics).
+        self._stats_lock = threading.Lock()
+        self._encode_stats = {kind: {"calls": 0, "texts": 0, "seconds": 0.0} for kind in ("query", "ingest")}
+        self.last_ingest: Dict[str, Any] = {}
+        self._index_counts: Tuple[int, int, int] = (-1, 0, 0)
 
     def load_json_file(self, json_path: str) -> List[Dict[str, Any]]:
         if not os.path.exists(json_path):
@@ -131,8 +284,98 @@ class ChunkedCandidateDB:
         else:
             raise ValueError("Unexpected JSON structure.")
 
-    def ingest_candidates(self, candidates_data: List[Any]):
-        valid_count = 0
+    def ingest_candidates(self, candidates_data: Iterable[Any], batch_size: int = 256,
+                          prune_missing: bool = False) -> Dict[str, Any]:
+        """
+        Chunks every candidate and syncs the chunks in batches of roughly
+        `batch_size`. Only new or changed chunks are encoded; chunks that a
+        re-ingested profile no longer produces are deleted.
+        `candidates_data` is consumed lazily, so a generator such as
+        profile_stream.iter_profiles() keeps memory bounded by one batch.
+        prune_missing=True marks `candidates_data` as the full corpus: the
+        chunks of every stored candidate it did not contain are deleted.
+        Returns the ingest stats (see _finish_ingest).
+        """
+        started = time.perf_counter()
+        stats = {"profiles": 0, "chunks": 0, "encoded": 0, "deleted": 0}
+        pending: List[Tuple[str, str, Dict[str, Any]]] = []
+        seen: set = set()
+        for candidate in self._valid_candidates(candidates_data):
+            # Flush on candidate boundaries so a profile is never split across syncs.
+            pending.extend(self._build_chunks(candidate))
+            stats["profiles"] += 1
+            if len(pending) >= batch_size:
+                seen.update(c[2]["candidate_id"] for c in pending)
+                self._sync_into(stats, pending, batch_size)
+                pending = []
+        if pending:
+            seen.update(c[2]["candidate_id"] for c in pending)
+            self._sync_into(stats, pending, batch_size)
+        if prune_missing:
+            stats["deleted"] += self._prune_candidates(seen)
+        return self._finish_ingest(stats, started)
+
+    def ingest_candidates_parallel(self, candidates_data: Iterable[Any], workers: int = None,
+                                   batch_size: int = 256, profiles_per_task: int = 32,
+                                   prune_missing: bool = False) -> Dict[str, Any]:
+        """
+        Same result as ingest_candidates, but chunk building and encoding run
+        in a pool of `workers` processes (default: one per CPU core), each with
+        its own model. Tasks are consumed in input order and this process is
+        the single writer, so the collection ends up identical to the serial
+        path. Workers skip chunks whose ids are already stored.
+        """
+        started = time.perf_counter()
+        workers = workers or os.cpu_count() or 1
+        stats = {"profiles": 0, "chunks": 0, "encoded": 0, "deleted": 0, "workers": workers}
+        known_ids = frozenset(self.collection.get(include=[])["ids"])
+
+        def tasks():
+            task = []
+            for candidate in self._valid_candidates(candidates_data):
+                task.append(candidate)
+                stats["profiles"] += 1
+                if len(task) >= profiles_per_task:
+                    yield task
+                    task = []
+            if task:
+                yield task
+
+        pending: List[Tuple[str, str, Dict[str, Any]]] = []
+        vectors: Dict[str, np.ndarray] = {}
+        seen: set = set()
+
+        def collect(result):
+            nonlocal pending, vectors
+            chunks, encoded_ids, embeddings = result
+            pending.extend(chunks)
+            seen.update(c[2]["candidate_id"] for c in chunks)
+            vectors.update(zip(encoded_ids, embeddings))
+            if len(pending) >= batch_size:
+                self._sync_into(stats, pending, batch_size, vectors)
+                pending = []
+                vectors = {}
+
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(workers, initializer=_ingest_worker_init, initargs=(known_ids, threads)) as pool:
+            # At most two tasks per worker in flight, collected in submission
+            # order: bounded memory for streamed input and a deterministic write order.
+            in_flight = deque()
+            for task in tasks():
+                in_flight.append(pool.apply_async(_ingest_worker_encode, (task,)))
+                if len(in_flight) >= 2 * workers:
+                    collect(in_flight.popleft().get())
+            while in_flight:
+                collect(in_flight.popleft().get())
+        if pending:
+            self._sync_into(stats, pending, batch_size, vectors)
+        if prune_missing:
+            stats["deleted"] += self._prune_candidates(seen)
+        return self._finish_ingest(stats, started)
+
+    @staticmethod
+    def _valid_candidates(candidates_data: Iterable[Any]) -> Iterable[Dict[str, Any]]:
         for candidate in candidates_data:
             if isinstance(candidate, str):
                 try:
@@ -143,17 +386,105 @@ class ChunkedCandidateDB:
             if not isinstance(candidate, dict):
                 print(f"Skipping non-dict candidate: {candidate}")
                 continue
-            self._index_candidate(candidate)
-            valid_count += 1
-        print(f"Ingested {valid_count} candidate profiles.")
+            yield candidate
+
+    def _prune_candidates(self, keep: set) -> int:
+        """
+        Deletes the chunks of every candidate not in `keep`. Returns the number
+        deleted. An empty `keep` (an ingest that produced no candidates, e.g.
+        an empty or malformed dump) is refused rather than clearing the index.
+        """
+        if not keep:
+            print("WARNING: full-corpus ingest saw no candidates; not pruning the index.")
+            return 0
+        stored = self.collection.get(include=["metadatas"])
+        stale = [doc_id for doc_id, metadata in zip(stored["ids"], stored["metadatas"])
+                 if metadata.get("candidate_id") not in keep]
+        self._delete_chunks(stale)
+        return len(stale)
+
+    def _sync_into(self, stats: Dict[str, Any], chunks: List[Tuple[str, str, Dict[str, Any]]],
+                   batch_size: int, vectors: Dict[str, np.ndarray] = None) -> None:
+        encoded, deleted = self._sync_chunks(chunks, batch_size, vectors)
+        stats["chunks"] += len(chunks)
+        stats["encoded"] += encoded
+        stats["deleted"] += deleted
+
+    def _finish_ingest(self, stats: Dict[str, Any], started: float) -> Dict[str, Any]:
+        """
+        Warms the keyword model (and the candidate index when two-stage
+        retrieval is on) and reports throughput. Stats: profiles,
+        chunks (built), encoded (written), deleted (stale), seconds and
+        chunks_per_sec (built chunks per wall-clock second).
+        """
+        self._refresh_keyword_model()
+        self._refresh_candidate_index()
+        stats["seconds"] = time.perf_counter() - started
+        stats["chunks_per_sec"] = stats["chunks"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+        self.last_ingest = dict(stats)
+        print(
+            f"Ingested {stats['profiles']} candidate profiles "
+            f"({stats['encoded']} chunks encoded, {stats['deleted']} stale chunks removed) "
+            f"in {stats['seconds']:.1f}s, {stats['chunks_per_sec']:.0f} chunks/sec."
+        )
+        return stats
 
     def _index_candidate(self, candidate_json: Dict[str, Any]) -> None:
-        candidate_id = candidate_json.get("id", str(datetime.now().timestamp()))
+        self._sync_chunks(self._build_chunks(candidate_json))
+
+    def _sync_chunks(self, chunks: List[Tuple[str, str, Dict[str, Any]]], batch_size: int = 256,
+                     vectors: Dict[str, np.ndarray] = None) -> Tuple[int, int]:
+        """
+        Makes the stored chunks of every candidate in `chunks` match `chunks`.
+        Chunk ids are content hashes, so an id already in the collection means
+        the text is unchanged and does not need to be encoded again.
+        `vectors` holds embeddings already computed elsewhere (by chunk id).
+        Returns (chunks written, stale chunks deleted).
+        """
+        latest = {c[0]: c for c in chunks}
+        candidate_ids = sorted({c[2]["candidate_id"] for c in chunks})
+        if not candidate_ids:
+            return 0, 0
+        existing = self.collection.get(
+            where={"candidate_id": {"$in": candidate_ids}},
+            include=[]
+        )["ids"]
+        existing_ids = set(existing)
+
+        stale_ids = [doc_id for doc_id in existing if doc_id not in latest]
+        self._delete_chunks(stale_ids)
+
+        fresh = [c for doc_id, c in latest.items() if doc_id not in existing_ids]
+        vectors = vectors or {}
+        ready = [c for c in fresh if c[0] in vectors]
+        for start in range(0, len(ready), batch_size):
+            batch = ready[start:start + batch_size]
+            self._store_chunks(
+                [c[0] for c in batch],
+                [c[1] for c in batch],
+                np.stack([vectors[c[0]] for c in batch]),
+                [c[2] for c in batch]
+            )
+        self._upsert_chunks([c for c in fresh if c[0] not in vectors], batch_size)
+        return len(fresh), len(stale_ids)
+
+    @staticmethod
+    def _build_chunks(candidate_json: Dict[str, Any]) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Turns one candidate profile into a list of (chunk_id, chunk_text, metadata)
+        tuples, one per section entry. Nothing is encoded or written here.
+        """
+        chunks: List[Tuple[str, str, Dict[str, Any]]] = []
+        candidate_id = candidate_json.get("id")
+        if not candidate_id:
+            # No id in the profile: derive one from its content so it is still stable.
+            candidate_id = hashlib.sha1(
+                json.dumps(candidate_json, sort_keys=True, default=str).encode("utf-8")
+            ).hexdigest()
         top_level_name = candidate_json.get("name")
         personal_info = candidate_json.get("personal_info", {})
         pi_name = personal_info.get("name")
         candidate_name = top_level_name if top_level_name else (pi_name if pi_name else "Unknown")
-        now_ts = str(datetime.now().timestamp())
 
         # 1) Personal Info
         pi_phone = personal_info.get("phone", "") or personal_info.get("phone_number", "")
@@ -173,7 +504,7 @@ class ChunkedCandidateDB:
                 "candidate_name": candidate_name,
                 "section": "personal_info"
             }
-            self._upsert_chunk(f"{candidate_id}-personal_info-{now_ts}", pi_str, pi_metadata)
+            chunks.append((chunk_id(candidate_id, "personal_info", 0, pi_str, pi_metadata), pi_str, pi_metadata))
 
         # 2) Education
         edu_entries: List[Dict[str, Any]] = []
@@ -199,7 +530,7 @@ class ChunkedCandidateDB:
                     "candidate_name": candidate_name,
                     "section": "education"
                 }
-                self._upsert_chunk(f"{candidate_id}-education-{i}-{now_ts}", edu_text, edu_metadata)
+                chunks.append((chunk_id(candidate_id, "education", i, edu_text, edu_metadata), edu_text, edu_metadata))
 
           # 3) Experience
         experiences = candidate_json.get("experience", [])
@@ -219,7 +550,7 @@ class ChunkedCandidateDB:
                     "candidate_name": candidate_name,
                     "section": "experience"
                 }
-                self._upsert_chunk(f"{candidate_id}-experience-{i}-{now_ts}", exp_text, exp_metadata)
+                chunks.append((chunk_id(candidate_id, "experience", i, exp_text, exp_metadata), exp_text, exp_metadata))
 
         # 4) Projects
         projects = candidate_json.get("projects", [])
@@ -236,7 +567,7 @@ class ChunkedCandidateDB:
                     "candidate_name": candidate_name,
                     "section": "project"
                 }
-                self._upsert_chunk(f"{candidate_id}-project-{i}-{now_ts}", proj_text, proj_metadata)
+                chunks.append((chunk_id(candidate_id, "project", i, proj_text, proj_metadata), proj_text, proj_metadata))
 
         # 5) Publications / Research Papers
         publications = candidate_json.get("publications", [])
@@ -268,7 +599,7 @@ class ChunkedCandidateDB:
                     "candidate_name": candidate_name,
                     "section": "publication"
                 }
-                self._upsert_chunk(f"{candidate_id}-publication-{i}-{now_ts}", pub_text, pub_metadata)
+                chunks.append((chunk_id(candidate_id, "publication", i, pub_text, pub_metadata), pub_text, pub_metadata))
 
 
         # 6) Research
@@ -289,7 +620,7 @@ class ChunkedCandidateDB:
                     "candidate_name": candidate_name,
                     "section": "research"
                 }
-                self._upsert_chunk(f"{candidate_id}-research-{i}-{now_ts}", r_text, r_metadata)
+                chunks.append((chunk_id(candidate_id, "research", i, r_text, r_metadata), r_text, r_metadata))
 
         # 7) Awards
         awards = candidate_json.get("awards", [])
@@ -309,7 +640,7 @@ class ChunkedCandidateDB:
                         "candidate_name": candidate_name,
                         "section": "awards"
                     }
-                    self._upsert_chunk(f"{candidate_id}-award-{i}-{now_ts}", a_text, a_metadata)
+                    chunks.append((chunk_id(candidate_id, "award", i, a_text, a_metadata), a_text, a_metadata))
 
         # 8) Athletics, High School, etc.
         if "athletic_career" in candidate_json:
@@ -326,7 +657,7 @@ class ChunkedCandidateDB:
                     "candidate_name": candidate_name,
                     "section": "athletics"
                 }
-                self._upsert_chunk(f"{candidate_id}-athletics-{now_ts}", ath_text, ath_metadata)
+                chunks.append((chunk_id(candidate_id, "athletics", 0, ath_text, ath_metadata), ath_text, ath_metadata))
 
         if "high_school" in candidate_json:
             hs = candidate_json["high_school"]
@@ -342,7 +673,7 @@ class ChunkedCandidateDB:
                     "candidate_name": candidate_name,
                     "section": "high_school"
                 }
-                self._upsert_chunk(f"{candidate_id}-highschool-{now_ts}", hs_text, hs_metadata)
+                chunks.append((chunk_id(candidate_id, "highschool", 0, hs_text, hs_metadata), hs_text, hs_metadata))
 
         # 9) Leadership/Extracurricular
         if "leadership" in candidate_json and isinstance(candidate_json["leadership"], dict):
@@ -359,7 +690,7 @@ class ChunkedCandidateDB:
                         "candidate_name": candidate_name,
                         "section": "leadership"
                     }
-                    self._upsert_chunk(f"{candidate_id}-leadership-{i}-{now_ts}", lead_text, lead_metadata)
+                    chunks.append((chunk_id(candidate_id, "leadership", i, lead_text, lead_metadata), lead_text, lead_metadata))
 
         extras = candidate_json.get("extracurricular_activities", [])
         if isinstance(extras, list) and extras:
@@ -378,7 +709,7 @@ class ChunkedCandidateDB:
                     "candidate_name": candidate_name,
                     "section": "extracurriculars"
                 }
-                self._upsert_chunk(f"{candidate_id}-extracurriculars-{now_ts}", extras_text, extras_metadata)
+                chunks.append((chunk_id(candidate_id, "extracurriculars", 0, extras_text, extras_metadata), extras_text, extras_metadata))
 
         if "notable_experiences" in candidate_json:
             nexp = candidate_json["notable_experiences"]
@@ -390,143 +721,528 @@ class ChunkedCandidateDB:
                         "candidate_name": candidate_name,
                         "section": "notable_experiences"
                     }
-                    self._upsert_chunk(f"{candidate_id}-notableexp-{now_ts}", text, nexp_metadata)
+                    chunks.append((chunk_id(candidate_id, "notableexp", 0, text, nexp_metadata), text, nexp_metadata))
+
+        return chunks
+
+    def _refresh_keyword_model(self):
+        """
+        Loads the inverted keyword index on first use (writes keep it in step
+        afterwards) and, for retrieval="dense", refits the TF-IDF vectorizer
+        if the collection changed. Hybrid retrieval never reads TF-IDF, so
+        writes do not pay for a refit there. Returns the TF-IDF vectorizer
+        (None if it is not fitted or the collection is empty).
+        """
+        with self._refresh_lock:
+            if not self._keyword_index_loaded:
+                stored = self.collection.get(include=["documents", "metadatas"])
+                self.keyword_index.clear()
+                self.keyword_index.add(stored["ids"], stored.get("documents") or [], stored.get("metadatas"))
+                self._keyword_index_loaded = True
+            if self.retrieval == "dense":
+                return self._tfidf_model()
+            return self._tfidf_vectorizer
+
+    def _tfidf_model(self):
+        """
+        The TF-IDF vectorizer fitted over all chunk documents, refitting it
+        only if the collection changed since the last fit. Returns None for
+        an empty collection.
+        """
+        with self._refresh_lock:
+            if self._tfidf_version != self.index_version:
+                documents = self.collection.get(include=["documents"]).get("documents") or []
+                if documents:
+                    vectorizer = TfidfVectorizer(stop_words='english')
+                    vectorizer.fit(documents)
+                    self._tfidf_vectorizer = vectorizer
+                    self._tfidf_features = vectorizer.get_feature_names_out()
+                else:
+                    self._tfidf_vectorizer = None
+                    self._tfidf_features = None
+                self._tfidf_version = self.index_version
+            return self._tfidf_vectorizer
+
+    def _refresh_candidate_index(self) -> None:
+        """Re-pools the candidates written since the last call (two-stage retrieval only)."""
+        if self.coarse_candidates > 0:
+            with self._refresh_lock:
+                self.candidate_index.refresh(self.collection)
 
     def extract_query_keywords(self, query_text: str, top_n: int = 5) -> List[str]:
         """
-        Builds a TF-IDF vectorizer over all candidate chunks and extracts the top_n keywords
-        from the query text based on their TF-IDF weights.
+        Extracts the top_n keywords from the query text based on their TF-IDF
+        weights under the cached corpus-wide vectorizer.
         """
-        # Get all chunk documents as a list of strings.
-        all_chunks = self.get_all_chunks().get("documents", [])
-        if not all_chunks or not isinstance(all_chunks, list):
+        vectorizer = self._tfidf_model()
+        if vectorizer is None:
             # Fallback: just split the query text.
             return query_text.lower().split()
-        
-        vectorizer = TfidfVectorizer(stop_words='english')
-        tfidf_matrix = vectorizer.fit_transform(all_chunks)
-        feature_names = vectorizer.get_feature_names_out()
-        # Transform the query text using the same vectorizer.
-        query_tfidf = vectorizer.transform([query_text])
-        scores = query_tfidf.toarray()[0]
-        # Get indices of top scoring words
-        top_indices = scores.argsort()[::-1]
-        keywords = []
-        for idx in top_indices:
-            if scores[idx] > 0:
-                keywords.append(feature_names[idx])
-            if len(keywords) >= top_n:
-                break
-        return keywords
+
+        # Only the query's own non-zero terms need ranking.
+        query_tfidf = vectorizer.transform([query_text]).tocsr()
+        order = np.argsort(-query_tfidf.data, kind="stable")[:top_n]
+        return [self._tfidf_features[query_tfidf.indices[i]] for i in order]
 
     def _upsert_chunk(self, doc_id: str, doc_text: str, metadata: Dict[str, Any]) -> None:
-        embedding = self.model.encode(doc_text)
+        self._upsert_chunks([(doc_id, doc_text, metadata)])
+
+    def _upsert_chunks(self, chunks: List[Tuple[str, str, Dict[str, Any]]], batch_size: int = 256) -> None:
+        """
+        Encodes and upserts (chunk_id, chunk_text, metadata) tuples with one
+        encode request and one collection write per `batch_size` chunks.
+        """
+        for start in range(0, len(chunks), batch_size):
+            batch = chunks[start:start + batch_size]
+            texts = [c[1] for c in batch]
+            encode_started = time.perf_counter()
+            embeddings = self.embedder.encode(texts, kind="ingest")
+            self._record_encode("ingest", len(texts), encode_started)
+            self._store_chunks([c[0] for c in batch], texts, embeddings, [c[2] for c in batch])
+
+    def use_keyword_index(self, index) -> None:
+        """
+        Serves keyword lookups from `index` (e.g. a MappedInvertedIndex over
+        snapshot postings) instead of building an InvertedIndex from the
+        collection. It must describe the collection as it is now.
+        """
+        with self._refresh_lock:
+            self.keyword_index = index
+            self._keyword_index_loaded = True
+
+    def _detach_keyword_index(self) -> None:
+        # A shared (mapped, read-only) keyword index is dropped on the first
+        # write; the next search rebuilds a private one from the collection.
+        if getattr(self.keyword_index, "shared", False):
+            with self._refresh_lock:
+                self.keyword_index = InvertedIndex(self.keyword_index.k1, self.keyword_index.b)
+                self._keyword_index_loaded = False
+
+    def _store_chunks(self, ids: List[str], documents: List[str], embeddings, metadatas: List[Dict[str, Any]]) -> None:
+        """Single write path for already-encoded chunks."""
+        if not ids:
+            return
         self.collection.upsert(
-            ids=[doc_id],
-            documents=[doc_text],
-            embeddings=[embedding],
-            metadatas=[metadata]
+            ids=ids,
+            documents=documents,
+            embeddings=embeddings,
+            metadatas=metadatas
         )
+        self._detach_keyword_index()
+        if self._keyword_index_loaded:
+            self.keyword_index.add(ids, documents, metadatas)
+        if self.candidate_index.loaded:
+            self.candidate_index.add(ids, metadatas)
+        self.index_version += 1
+
+    def _delete_chunks(self, ids: List[str]) -> None:
+        if not ids:
+            return
+        self.collection.delete(ids=ids)
+        self._detach_keyword_index()
+        if self._keyword_index_loaded:
+            self.keyword_index.remove(ids)
+        if self.candidate_index.loaded:
+            self.candidate_index.remove(ids)
+        self.index_version += 1
 
     def get_all_chunks(self):
         return self.collection.get(include=["documents", "metadatas", "embeddings"])
 
-    def query_chunks(self, semantic_query: str, filters: Dict[str, Any] = None, n_results: int = 400):
+    def _encode_queries(self, texts: List[str]) -> np.ndarray:
         """
-        Takes a semantic_query (some text) and optional filters (e.g. {"section": "experience"}).
-        Returns chunk-level matches grouped by candidate.
-        Boosts chunks that contain keywords from the query as determined by TF-IDF.
-        """
-        if filters is None:
-            filters = {}
-        
-        # Build the 'where' clause from filters.
-        if len(filters) == 0:
-            where_clause = None
-        elif len(filters) == 1:
-            (k, v) = list(filters.items())[0]
-            where_clause = {k: v}
-        else:
-            and_clauses = [{k: v} for k, v in filters.items()]
-            where_clause = {"$and": and_clauses}
+        Embeds all query texts, serving repeats from the embedding cache and
+        encoding the rest with a single encode request.
+        """
+        keys = [normalize_query(t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+        with self._cache_lock:
+            for key in keys:
+                embedding = self._embedding_cache.get(key)
+                if embedding is not None:
+                    self._embedding_cache.move_to_end(key)
+                    found[key] = embedding
+            self._cache_counters["embedding_hits"] += sum(1 for key in keys if key in found)
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing:
+            encode_started = time.perf_counter()
+            encoded = self.embedder.encode(missing, kind="query")
+            self._record_encode("query", len(missing), encode_started)
+            found.update(zip(missing, encoded))
+            with self._cache_lock:
+                self._cache_counters["embedding_misses"] += len(missing)
+                if self.query_cache_size > 0:
+                    for key in missing:
+                        self._embedding_cache[key] = found[key]
+                    while len(self._embedding_cache) > self.query_cache_size:
+                        self._embedding_cache.popitem(last=False)
+        if not keys:
+            return np.empty((0, self.embedder.dimension()), dtype=np.float32)
+        return np.stack([found[key] for key in keys])
+
+    def _record_encode(self, kind: str, texts: int, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            stats = self._encode_stats[kind]
+            stats["calls"] += 1
+            stats["texts"] += texts
+            stats["seconds"] += elapsed
+
+    def encode_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Encode requests, texts encoded and total seconds callers spent in them
+        (embedding-service queue wait + inference), per "query" / "ingest".
+        """
+        with self._stats_lock:
+            return {kind: dict(stats) for kind, stats in self._encode_stats.items()}
 
+    def index_stats(self) -> Dict[str, int]:
+        """
+        Chunk and candidate counts. Recounted only when index_version changed
+        since the last call (a metadata scan), so it is cheap to poll.
+        """
+        version, chunks, candidates = self._index_counts
+        if version != self.index_version:
+            version = self.index_version
+            stored = self.collection.get(include=["metadatas"])
+            chunks = len(stored["ids"])
+            candidates = len({m.get("candidate_id") for m in stored["metadatas"]})
+            self._index_counts = (version, chunks, candidates)
+        return {"chunks": chunks, "candidates": candidates}
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current sizes of the query and result caches."""
+        with self._cache_lock:
+            stats = dict(self._cache_counters)
+            stats["embedding_cache_size"] = len(self._embedding_cache)
+            stats["result_cache_size"] = len(self._result_cache)
+        return stats
+
+    @staticmethod
+    def _where_clause(filters: Dict[str, Any]):
+        # Build the 'where' clause from filters. A list value means "any of".
+        if not filters:
+            return None
+        clauses = [{k: {"$in": v} if isinstance(v, list) else v} for k, v in filters.items()]
+        if len(clauses) == 1:
+            return clauses[0]
+        return {"$and": clauses}
+
+    def _vector_query(self, query_embeddings: np.ndarray, where_clause, n_results: int) -> Dict[str, Any]:
         query_params = {
-            "query_texts": [semantic_query],
+            "query_embeddings": query_embeddings,
             "n_results": n_results,
             "include": ["documents", "metadatas", "distances"]
         }
         if where_clause is not None:
             query_params["where"] = where_clause
+        return self.collection.query(**query_params)
 
-        results = self.collection.query(**query_params)
-        if not results or not results.get("documents"):
-            return []
-
-        chunk_docs = results["documents"][0]
-        chunk_metas = results["metadatas"][0]
-        chunk_dists = results["distances"][0]
-
-        # Extract TF-IDF keywords from the query
-        query_keywords = set(self.extract_query_keywords(semantic_query))
-
-        candidate_hits = {}
-        for doc, meta, dist in zip(chunk_docs, chunk_metas, chunk_dists):
-            # Compute base similarity
-            similarity = 1 - dist
-
-            # Compute bonus from keyword matches.
-            bonus = 0.0
-            doc_lower = doc.lower()
-            for kw in query_keywords:
-                if kw in doc_lower:
-                    bonus += 0.01  # you can tune this bonus value
-            new_similarity = min(similarity + bonus, 1.0)
+    def query_chunks(self, semantic_query: str, filters: Dict[str, Any] = None, n_results: int = 400,
+                     timings: Dict[str, float] = None, max_candidates: int = 15):
+        """
+        Takes a semantic_query (some text) and optional filters (e.g. {"section": "experience"}).
+        Returns chunk-level matches grouped by candidate.
+        Boosts chunks that contain keywords from the query as determined by TF-IDF,
+        or fuses in BM25 when retrieval="hybrid".
+        Per-stage wall times (ms) are added to `timings` if one is passed.
+        At most max_candidates candidates are returned, best first.
+        """
+        return self._run_subqueries([(semantic_query, filters or {})], n_results, timings, max_candidates)[0]
 
-            # Optionally skip very low scoring chunks
-            if new_similarity < -0.5:
+    def _run_subqueries(self, subqueries: List[Tuple[str, Dict[str, Any]]], n_results: int = 400,
+                        timings: Dict[str, float] = None, max_candidates: int = 15) -> List[List[Dict[str, Any]]]:
+        """
+        Runs several (semantic_query, filters) pairs at once: every query text is
+        encoded in one model call, and subqueries sharing the same filters go to
+        the collection as a single multi-embedding query. Returns one
+        query_chunks-style candidate list per subquery, in input order.
+        """
+        if timings is None:
+            timings = {}
+        if not subqueries:
+            return []
+        started = time.perf_counter()
+        query_embeddings = self._encode_queries([semantic for semantic, _ in subqueries])
+        add_timing(timings, "encode", started)
+
+        # Loads the keyword index (and refits TF-IDF in dense mode) if needed.
+        started = time.perf_counter()
+        self._refresh_keyword_model()
+        add_timing(timings, "tfidf", started)
+
+        groups: Dict[str, List[int]] = {}
+        for i, (_, filters) in enumerate(subqueries):
+            groups.setdefault(json.dumps(self._where_clause(filters), sort_keys=True), []).append(i)
+
+        ranked: List[List[Dict[str, Any]]] = [[] for _ in subqueries]
+        for where_key, indices in groups.items():
+            where_clause = json.loads(where_key)
+            if self.coarse_candidates > 0:
+                results = self._two_stage_query(query_embeddings[indices], subqueries[indices[0]][1], n_results, timings)
+            else:
+                started = time.perf_counter()
+                results = self._vector_query(query_embeddings[indices], where_clause, n_results)
+                add_timing(timings, "dense", started)
+            if not results or not results.get("documents"):
+                continue
+            for row, i in enumerate(indices):
+                semantic, filters = subqueries[i]
+                chunk_ids = list(results["ids"][row])
+                chunk_docs = list(results["documents"][row])
+                chunk_metas = list(results["metadatas"][row])
+                similarity = 1.0 - np.asarray(results["distances"][row], dtype=np.float64)
+                if self.retrieval == "hybrid":
+                    scores = self._fuse_lexical(
+                        semantic, query_embeddings[i], filters, where_clause, n_results,
+                        chunk_ids, chunk_docs, chunk_metas, similarity, timings
+                    )
+                else:
+                    started = time.perf_counter()
+                    scores = self._keyword_bonus(semantic, chunk_ids, similarity)
+                    add_timing(timings, "keywords", started)
+                started = time.perf_counter()
+                ranked[i] = self._rank_chunks(chunk_ids, chunk_docs, chunk_metas, scores, max_candidates)
+                add_timing(timings, "aggregate", started)
+        return ranked
+
+    def _two_stage_query(self, query_embeddings: np.ndarray, filters: Dict[str, Any], n_results: int,
+                         timings: Dict[str, float]) -> Dict[str, Any]:
+        """
+        Coarse pass over the candidate index, then a chunk search restricted
+        to each query's shortlisted candidates. Returns the same per-query
+        lists as _vector_query.
+        """
+        started = time.perf_counter()
+        self._refresh_candidate_index()
+        sections = filters.get("section")
+        if isinstance(sections, str):
+            sections = [sections]
+        shortlists = self.candidate_index.shortlist(query_embeddings, self.coarse_candidates, sections)
+        add_timing(timings, "coarse", started)
+
+        started = time.perf_counter()
+        results: Dict[str, List[Any]] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for query_embedding, shortlist in zip(query_embeddings, shortlists):
+            if not shortlist:
+                for field in results:
+                    results[field].append([])
                 continue
+            where_clause = self._where_clause({**filters, "candidate_id": shortlist})
+            part = self._vector_query(query_embedding[None, :], where_clause, n_results)
+            for field in results:
+                results[field].append(part[field][0])
+        add_timing(timings, "dense", started)
+        return results
+
+    def _keyword_bonus(self, semantic_query: str, chunk_ids: List[str], similarity: np.ndarray) -> np.ndarray:
+        """
+        Base similarity plus a flat bonus per TF-IDF query keyword the chunk
+        contains. The hit matrix (chunks x keywords) comes from posting-list
+        lookups, not text scans.
+        """
+        query_keywords = list(set(self.extract_query_keywords(semantic_query)))
+        if query_keywords:
+            hits = self.keyword_index.hit_matrix(chunk_ids, query_keywords)
+            similarity = similarity + 0.01 * hits.sum(axis=1)  # you can tune this bonus value
+        return np.minimum(similarity, 1.0)
+
+    def _fuse_lexical(self, semantic_query: str, query_embedding: np.ndarray, filters: Dict[str, Any],
+                      where_clause, n_results: int, chunk_ids: List[str], chunk_docs: List[str],
+                      chunk_metas: List[Dict[str, Any]], similarity: np.ndarray,
+                      timings: Dict[str, float]) -> np.ndarray:
+        """
+        BM25 leg of hybrid retrieval. Scores every chunk matching a query term,
+        adds the top lexical hits the dense search missed to the chunk lists
+        (in place, with their dense similarity computed from stored vectors),
+        and returns the fused score for every chunk.
+        """
+        started = time.perf_counter()
+        self._refresh_keyword_model()
+        terms = [t for t in tokenize(semantic_query) if t not in ENGLISH_STOP_WORDS]
+        sections = filters.get("section")
+        if isinstance(sections, str):
+            sections = {sections}
+        elif sections is not None:
+            sections = set(sections)
+        lexical = self.keyword_index.bm25(terms, sections)
+
+        seen = set(chunk_ids)
+        top_lexical = sorted(lexical, key=lexical.get, reverse=True)[:min(n_results, 100)]
+        missing = [doc_id for doc_id in top_lexical if doc_id not in seen]
+        if missing:
+            params = {"ids": missing, "include": ["documents", "metadatas", "embeddings"]}
+            if where_clause is not None:
+                params["where"] = where_clause
+            extra = self.collection.get(**params)
+            if extra["ids"]:
+                vectors = np.asarray(extra["embeddings"], dtype=np.float32)
+                query = query_embedding / (np.linalg.norm(query_embedding) or 1.0)
+                cosine = vectors @ query / np.maximum(np.linalg.norm(vectors, axis=1), 1e-12)
+                # Same scale as 1 - distance for Chroma's l2 space on unit vectors.
+                similarity = np.concatenate([similarity, 2.0 * cosine - 1.0])
+                chunk_ids.extend(extra["ids"])
+                chunk_docs.extend(extra["documents"])
+                chunk_metas.extend(extra["metadatas"])
+        add_timing(timings, "bm25", started)
+
+        started = time.perf_counter()
+        bm25 = np.array([lexical.get(doc_id, 0.0) for doc_id in chunk_ids], dtype=np.float64)
+        if self.fusion == "rrf":
+            k = 60.0
+            dense_rank = np.empty(len(chunk_ids))
+            dense_rank[np.argsort(-similarity, kind="stable")] = np.arange(1, len(chunk_ids) + 1)
+            lexical_rank = np.empty(len(chunk_ids))
+            lexical_rank[np.argsort(-bm25, kind="stable")] = np.arange(1, len(chunk_ids) + 1)
+            scores = 1.0 / (k + dense_rank) + np.where(bm25 > 0, 1.0 / (k + lexical_rank), 0.0)
+        else:
+            top = bm25.max() if bm25.size else 0.0
+            if top > 0:
+                similarity = similarity + self.bm25_weight * bm25 / top
+            scores = np.minimum(similarity, 1.0)
+        add_timing(timings, "fusion", started)
+        return scores
+
+    def _rank_chunks(self, chunk_ids: List[str], chunk_docs: List[str], chunk_metas: List[Dict[str, Any]],
+                     scores: np.ndarray, top_k: int = 15) -> List[Dict[str, Any]]:
+        """
+        Groups scored chunks into the top_k candidates (best chunk score per
+        candidate). The per-candidate max and the top-k cut are array
+        operations; chunk dicts are only built for the candidates that make
+        the cut.
+        """
+        if not chunk_ids:
+            return []
 
-            candidate_id = meta.get("candidate_id", "Unknown")
-            candidate_name = meta.get("candidate_name", "Unknown")
-            snippet_text = doc[:800] + ("..." if len(doc) > 800 else "")
-            chunk_info = {
-                "snippet": snippet_text,
-                "section": meta.get("section", ""),
-                "similarity_score": new_similarity,
-            }
-            if candidate_id not in candidate_hits:
-                candidate_hits[candidate_id] = {"candidate_name": candidate_name, "chunks": []}
-            candidate_hits[candidate_id]["chunks"].append(chunk_info)
+        # Optionally skip very low scoring chunks
+        kept = np.flatnonzero(scores >= -0.5)
+        if kept.size == 0:
+            return []
 
+        # Group-by candidate: integer codes in first-seen order (ids may mix
+        # ints and strings, so they are hashed, never sorted) and max score per group.
+        index: Dict[Any, int] = {}
+        codes = np.fromiter((index.setdefault(chunk_metas[i].get("candidate_id", "Unknown"), len(index))
+                             for i in kept), dtype=np.intp, count=len(kept))
+        unique_ids = list(index)
+        kept_scores = scores[kept]
+        best = np.full(len(unique_ids), -np.inf)
+        np.maximum.at(best, codes, kept_scores)
+
+        # Top-k candidates by best score, ties broken by first appearance
+        # (the group number itself).
+        groups = np.arange(len(unique_ids))
+        if len(groups) > top_k:
+            threshold = -np.partition(-best, top_k - 1)[top_k - 1]
+            groups = groups[best >= threshold]
+        groups = groups[np.lexsort((groups, -best[groups]))][:top_k]
+
+        # Only now build Python objects, for the chunks of the chosen candidates.
+        by_group = np.argsort(codes, kind="stable")
+        starts = np.searchsorted(codes[by_group], groups, side="left")
+        ends = np.searchsorted(codes[by_group], groups, side="right")
         candidate_list = []
-        for cid, data in candidate_hits.items():
-            best_score = max(ch["similarity_score"] for ch in data["chunks"])
+        for g, start, end in zip(groups, starts, ends):
+            chunks = []
+            for pos in by_group[start:end]:
+                row = kept[pos]
+                doc = chunk_docs[row]
+                chunks.append({
+                    "snippet": doc[:800] + ("..." if len(doc) > 800 else ""),
+                    "section": chunk_metas[row].get("section", ""),
+                    "similarity_score": float(kept_scores[pos]),
+                })
+            first_meta = chunk_metas[kept[by_group[start]]]
             candidate_list.append({
-                "candidate_id": cid,
-                "candidate_name": data["candidate_name"],
-                "score": best_score,
-                "chunks": data["chunks"]
+                "candidate_id": unique_ids[g],
+                "candidate_name": first_meta.get("candidate_name", "Unknown"),
+                "score": float(best[g]),
+                "chunks": chunks
             })
-        candidate_list.sort(key=lambda x: x["score"], reverse=True)
-        candidate_list = candidate_list[:15]
         return candidate_list
 
-
-    def multi_subquery_search(self, user_input: str, n_results: int = 400):
+    def multi_subquery_search(self, user_input: str, n_results: int = 400, timings: Dict[str, float] = None,
+                              max_candidates: int = 15):
         """
         Splits the user_input on "and" to create multiple subqueries.
         - Each subquery is further parsed for filters (e.g. 'industry' => section=experience, etc.).
         - We run each subquery separately, then intersect the candidate results.
         - For each candidate, we pick distinct top chunks for each subquery.
         Returns a list of candidate-level results with a "chosen_subchunks" key.
+        Each subquery keeps its best max_candidates candidates (so a larger
+        value also yields a longer ranked list to page through).
+        Repeated searches for the same normalized query and parameters against
+        an unchanged index are served from the result cache (as a copy, so
+        callers may modify them).
+        """
+        return self.multi_subquery_search_batch([user_input], n_results, timings, max_candidates)[0]
+
+    def multi_subquery_search_batch(self, user_inputs: List[str], n_results: int = 400,
+                                    timings: Dict[str, float] = None,
+                                    max_candidates: int = 15) -> List[List[Dict[str, Any]]]:
         """
+        multi_subquery_search for several queries at once. Queries not in the
+        result cache are split into subqueries, and the subqueries of all of
+        them go through one _run_subqueries call (one model call, one vector
+        query per distinct filter). Returns one result list per query, in order.
+        """
+        if timings is None:
+            timings = {}
+        started = time.perf_counter()
+        user_inputs = [normalize_query(u) for u in user_inputs]
+        version = self.index_version
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        with self._cache_lock:
+            for user_input in dict.fromkeys(user_inputs):
+                key = (user_input, n_results, max_candidates, version)
+                cached = self._result_cache.get(key)
+                if cached is not None:
+                    self._result_cache.move_to_end(key)
+                    self._cache_counters["result_hits"] += 1
+                    results[user_input] = cached
+                else:
+                    self._cache_counters["result_misses"] += 1
+        add_timing(timings, "cache", started)
+
+        misses = [u for u in dict.fromkeys(user_inputs) if u not in results]
+        if misses:
+            started = time.perf_counter()
+            plans = [self._split_subqueries(u) for u in misses]
+            add_timing(timings, "parse", started)
+            ranked = self._run_subqueries([sq for plan in plans for sq in plan], n_results, timings, max_candidates)
+            started = time.perf_counter()
+            start = 0
+            for user_input, plan in zip(misses, plans):
+                results[user_input] = self._merge_subquery_results(ranked[start:start + len(plan)])
+                start += len(plan)
+            add_timing(timings, "aggregate", started)
+            if self.result_cache_size > 0:
+                with self._cache_lock:
+                    # Entries from older index versions can never hit again.
+                    for stale in [k for k in self._result_cache if k[-1] != self.index_version]:
+                        del self._result_cache[stale]
+                    for user_input in misses:
+                        key = (user_input, n_results, max_candidates, version)
+                        self._result_cache[key] = copy.deepcopy(results[user_input])
+                    while len(self._result_cache) > self.result_cache_size:
+                        self._result_cache.popitem(last=False)
+        return [copy.deepcopy(results[u]) for u in user_inputs]
+
+    @staticmethod
+    def _split_subqueries(user_input: str) -> List[Tuple[str, Dict[str, Any]]]:
         # Step 1: Split the user query on "and"
         sub_texts = [s.strip() for s in user_input.lower().split(" and ")]
 
-        # If there is only one subquery, fall back to normal query_chunks
+        # If there is only one subquery, fall back to a normal query_chunks search
         if len(sub_texts) < 2:
-            base_semantic, base_filters = parse_subquery_for_filters(user_input)
-            res = self.query_chunks(base_semantic, base_filters, n_results)
+            return [parse_subquery_for_filters(user_input)]
+        return [parse_subquery_for_filters(stext) for stext in sub_texts]
+
+    @staticmethod
+    def _merge_subquery_results(results_per_subquery: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Intersects the per-subquery candidate lists of one query (steps 2-4 below)."""
+        if len(results_per_subquery) == 1:
+            res = results_per_subquery[0]
             # For each candidate in the fallback result, choose the best chunk as a single subquery.
             for cand in res:
                 if cand["chunks"]:
@@ -536,12 +1252,10 @@ class ChunkedCandidateDB:
                     cand["chosen_subchunks"] = []
             return res
 
-        # Step 2: Run each subquery separately
+        # Step 2: Collect every candidate's score and chunks per subquery
         merged = {}
-        sub_count = len(sub_texts)
-        for i, stext in enumerate(sub_texts):
-            sub_semantic, sub_filters = parse_subquery_for_filters(stext)
-            results_subq = self.query_chunks(sub_semantic, sub_filters, n_results)
+        sub_count = len(results_per_subquery)
+        for i, results_subq in enumerate(results_per_subquery):
             for c in results_subq:
                 cid = c["candidate_id"]
                 cname = c["candidate_name"]
@@ -595,6 +1309,32 @@ class ChunkedCandidateDB:
 
 
 
+###############################################################################
+# Parallel ingest workers (module level so spawned processes can import them)
+###############################################################################
+
+_worker_model = None
+_worker_known_ids = frozenset()
+
+def _ingest_worker_init(known_ids: frozenset, threads: int) -> None:
+    global _worker_model, _worker_known_ids
+    import torch
+    torch.set_num_threads(threads)
+    _worker_model = SentenceTransformer(MODEL_NAME)
+    _worker_known_ids = known_ids
+
+def _ingest_worker_encode(candidates: List[Dict[str, Any]]):
+    """Builds the chunks of a slice of profiles and encodes the ones not stored yet."""
+    chunks = []
+    for candidate in candidates:
+        chunks.extend(ChunkedCandidateDB._build_chunks(candidate))
+    todo = {c[0]: c[1] for c in chunks if c[0] not in _worker_known_ids}
+    if not todo:
+        return chunks, [], np.empty((0, 0), dtype=np.float32)
+    embeddings = _worker_model.encode(list(todo.values()), batch_size=len(todo))
+    return chunks, list(todo), np.asarray(embeddings, dtype=np.float32)
+
+
 ###############################################################################
 # 3) Aggregator & Plotting (Optional)
 ###############################################################################
@@ -607,8 +1347,7 @@ def aggregate_candidate_scores(db: ChunkedCandidateDB):
     chunk_metadata = all_data["metadatas"]
     research_prompt = "Candidate with significant academic research or publications."
     industry_prompt = "Candidate with extensive industry experience or practical engineering work."
-    research_emb = db.model.encode(research_prompt)
-    industry_emb = db.model.encode(industry_prompt)
+    research_emb, industry_emb = db.embedder.encode([research_prompt, industry_prompt], kind="query")
     scores_by_candidate = {}
     for emb, meta in zip(chunk_embeddings, chunk_metadata):
         c_id = meta.get("candidate_id", "Unknown")
@@ -656,8 +1395,7 @@ def plot_research_vs_industry(df: pd.DataFrame):
 
 if __name__ == "__main__":
     db = ChunkedCandidateDB(persist_directory="./chroma_db")
-    data = db.load_json_file('candidates.json')
-    db.ingest_candidates(data)
+    db.ingest_candidates(iter_profiles('candidates.json'))
 
     # # Optional aggregator + plot
     # df = aggregate_candidate_scores(db)
@@ -0,0 +1,124 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Tuple
+
+import numpy as np
+
+from metrics import Counter, Histogram
+
+###############################################################################
+# Micro-batching embedding service
+#
+# The one place the sentence-transformer runs in the process. Callers on any
+# thread (search workers encoding queries, ingest encoding chunks) submit
+# texts to a queue; a single worker thread takes the first waiting request,
+# keeps collecting more for up to max_wait_ms (or until max_batch_size
+# texts), runs them as one model call and hands every caller its rows.
+# Concurrent searches therefore share a forward pass instead of contending
+# for the model, and a lone request waits at most max_wait_ms extra.
+# Within a collected batch, query requests run as their own model call
+# before the ingest requests, so a search is never held up by the forward
+# pass of an ingest batch it arrived with. A request larger than
+# max_batch_size is run as its own batch, not split.
+#
+# Batch sizes, queue waits and requests per kind are kept in metrics.py
+# Histogram / Counter objects (see metrics(), registered by api.py).
+###############################################################################
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+QUEUE_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# (texts, kind, enqueued at, future)
+_Request = Tuple[List[str], str, float, Future]
+
+
+class EmbeddingService:
+    def __init__(self, model, max_batch_size: int = 256, max_wait_ms: float = 2.0):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._worker = None
+        # A request that did not fit the previous batch; it starts the next one.
+        self._carry = None
+        self._start_lock = threading.Lock()
+        self.batch_size = Histogram(
+            "embedding_batch_size", "Texts per model call of the embedding service", buckets=BATCH_SIZE_BUCKETS)
+        self.queue_wait = Histogram(
+            "embedding_queue_wait_seconds", "Time an encode request waited before its batch ran",
+            ["kind"], buckets=QUEUE_WAIT_BUCKETS)
+        self.requests = Counter(
+            "embedding_requests_total", "Encode requests submitted to the embedding service", ["kind"])
+
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def metrics(self) -> List:
+        return [self.batch_size, self.queue_wait, self.requests]
+
+    def encode(self, texts: List[str], kind: str = "query") -> np.ndarray:
+        """Float32 embeddings of `texts` (one row each); blocks until its batch has run."""
+        if not texts:
+            return np.empty((0, self.dimension()), dtype=np.float32)
+        self._ensure_worker()
+        future: Future = Future()
+        self.requests.inc(kind=kind)
+        self._queue.put((list(texts), kind, time.perf_counter(), future))
+        return future.result()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                worker = threading.Thread(target=self._run, name="embedding-service", daemon=True)
+                worker.start()
+                self._worker = worker
+
+    def _collect(self, first: _Request) -> List[_Request]:
+        batch = [first]
+        size = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if size + len(request[0]) > self.max_batch_size:
+                self._carry = request
+                break
+            batch.append(request)
+            size += len(request[0])
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first, self._carry = self._carry or self._queue.get(), None
+            batch = self._collect(first)
+            queries = [request for request in batch if request[1] == "query"]
+            others = [request for request in batch if request[1] != "query"]
+            for group in (queries, others):
+                if group:
+                    self._encode_group(group)
+
+    def _encode_group(self, group: List[_Request]) -> None:
+        """One model call for `group`; every caller gets its rows (or the exception)."""
+        started = time.perf_counter()
+        texts: List[str] = []
+        for request_texts, kind, enqueued, _ in group:
+            texts.extend(request_texts)
+            self.queue_wait.observe(started - enqueued, kind=kind)
+        self.batch_size.observe(len(texts))
+        try:
+            embeddings = np.asarray(self.model.encode(texts, batch_size=len(texts)), dtype=np.float32)
+        except Exception as e:
+            for _, _, _, future in group:
+                future.set_exception(e)
+            return
+        offset = 0
+        for request_texts, _, _, future in group:
+            future.set_result(embeddings[offset:offset + len(request_texts)])
+            offset += len(request_texts)
@@ -0,0 +1,292 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+from contextlib import contextmanager
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; snapshot_lock() is then a no-op
+    fcntl = None
+
+from chunked_candidates_final import ChunkedCandidateDB, MODEL_NAME
+from keyword_index import MappedInvertedIndex, write_postings
+from mmap_store import MappedMetadata, MappedStrings, write_metadata, write_string_index, write_strings
+from numpy_index import NumpyCollection
+from partitioned_index import PARTITION_KEY, PartitionedCollection
+from profile_stream import iter_profiles
+
+###############################################################################
+# Precomputed chunk embeddings
+#
+# Layout of a snapshot directory:
+#   embeddings.npy  float32 matrix of L2-normalized vectors, one row per
+#                   chunk (row i <-> ids[i]), rows grouped by section
+#   chunks.json     {"model", "source_sha1", "count", "layout", "sections":
+#                   {section: [first row, end row]}, "metadata_keys"}
+#   ids.bin, documents.bin, meta_<key>.*   ids (with a sorted-order index),
+#                   documents and metadata in the memory-mappable layout of
+#                   mmap_store.py
+#   keywords_*      BM25 postings of the documents (keyword_index.write_postings)
+# Snapshots of an older layout still load but cannot be attached (the API
+# rebuilds them); those from before the mapped layout keep "ids",
+# "documents" and "metadatas" lists in chunks.json.
+#
+# Build it offline:
+#   python embedding_snapshot.py candidates.json ./snapshot
+# and the API memory-maps it at startup instead of re-encoding the corpus.
+# With the numpy backend, attach_snapshot() serves searches straight from
+# the mapped files, so N API workers share one copy of the index through
+# the page cache; snapshot_lock() makes only one of them build it.
+###############################################################################
+
+EMBEDDINGS_FILE = "embeddings.npy"
+CHUNKS_FILE = "chunks.json"
+IDS_FILE = "ids.bin"
+DOCUMENTS_FILE = "documents.bin"
+METADATA_PREFIX = "meta_"
+KEYWORD_PREFIX = "keywords_"
+# Bumped when attach_snapshot() needs files older snapshots do not have.
+SNAPSHOT_LAYOUT = 2
+
+
+def file_sha1(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def snapshot_exists(snapshot_dir: str) -> bool:
+    return (
+        os.path.exists(os.path.join(snapshot_dir, EMBEDDINGS_FILE))
+        and os.path.exists(os.path.join(snapshot_dir, CHUNKS_FILE))
+    )
+
+
+@contextmanager
+def snapshot_lock(snapshot_dir: str):
+    """
+    Exclusive lock on `snapshot_dir` across processes (a flock on a sibling
+    .lock file): the first API worker to start builds or refreshes the
+    snapshot while the others wait, then they all find it up to date.
+    """
+    if fcntl is None:
+        yield
+        return
+    parent = os.path.dirname(os.path.abspath(snapshot_dir))
+    os.makedirs(parent, exist_ok=True)
+    with open(snapshot_dir.rstrip("/") + ".lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def build_snapshot(db: ChunkedCandidateDB, json_path: str, snapshot_dir: str, batch_size: int = 256) -> int:
+    """
+    Chunks every profile in `json_path`, encodes the chunks in batches and
+    writes them as a snapshot. Files are written to a temporary directory
+    and swapped in at the end, so readers never see a half-written snapshot.
+    Returns the number of chunks written.
+    """
+    chunks: Dict[str, Tuple[str, str, Dict[str, Any]]] = {}
+    for candidate in iter_profiles(json_path):
+        if not isinstance(candidate, dict):
+            continue
+        for chunk in db._build_chunks(candidate):
+            chunks[chunk[0]] = chunk
+    # Grouped by section, so every partition of a PartitionedCollection is
+    # a contiguous slice of the mapped matrix.
+    ids = sorted(chunks, key=lambda i: str(chunks[i][2].get(PARTITION_KEY, "")))
+    documents = [chunks[i][1] for i in ids]
+    metadatas = [chunks[i][2] for i in ids]
+    sections: Dict[str, List[int]] = {}
+    for row, metadata in enumerate(metadatas):
+        bounds = sections.setdefault(str(metadata.get(PARTITION_KEY, "")), [row, row])
+        bounds[1] = row + 1
+
+    tmp_dir = snapshot_dir.rstrip("/") + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    dim = db.embedder.dimension()
+    matrix = np.lib.format.open_memmap(
+        os.path.join(tmp_dir, EMBEDDINGS_FILE), mode="w+", dtype=np.float32, shape=(len(ids), dim)
+    )
+    for start in range(0, len(ids), batch_size):
+        batch = documents[start:start + batch_size]
+        vectors = db.embedder.encode(batch, kind="ingest")
+        matrix[start:start + len(batch)] = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    matrix.flush()
+    del matrix
+
+    write_strings(os.path.join(tmp_dir, IDS_FILE), ids)
+    write_string_index(os.path.join(tmp_dir, IDS_FILE), ids)
+    write_strings(os.path.join(tmp_dir, DOCUMENTS_FILE), documents)
+    metadata_keys = write_metadata(os.path.join(tmp_dir, METADATA_PREFIX), metadatas)
+    write_postings(os.path.join(tmp_dir, KEYWORD_PREFIX), documents)
+    with open(os.path.join(tmp_dir, CHUNKS_FILE), "w") as f:
+        json.dump({
+            "model": MODEL_NAME,
+            "source_sha1": file_sha1(json_path),
+            "count": len(ids),
+            "layout": SNAPSHOT_LAYOUT,
+            "sections": sections,
+            "metadata_keys": metadata_keys,
+        }, f)
+
+    shutil.rmtree(snapshot_dir, ignore_errors=True)
+    os.replace(tmp_dir, snapshot_dir)
+    return len(ids)
+
+
+def load_snapshot(snapshot_dir: str) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Returns (embeddings, chunks). `embeddings` is a read-only memory map, so
+    rows are only paged in when they are actually touched; for a mapped
+    snapshot chunks["ids"], ["documents"] and ["metadatas"] are mapped
+    sequences as well.
+    """
+    embeddings = np.load(os.path.join(snapshot_dir, EMBEDDINGS_FILE), mmap_mode="r")
+    with open(os.path.join(snapshot_dir, CHUNKS_FILE), "r") as f:
+        chunks = json.load(f)
+    if "sections" in chunks:
+        chunks["ids"] = MappedStrings(os.path.join(snapshot_dir, IDS_FILE))
+        chunks["documents"] = MappedStrings(os.path.join(snapshot_dir, DOCUMENTS_FILE))
+        chunks["metadatas"] = MappedMetadata(os.path.join(snapshot_dir, METADATA_PREFIX), chunks["metadata_keys"])
+        if chunks.get("layout") == SNAPSHOT_LAYOUT:
+            chunks["keyword_prefix"] = os.path.join(snapshot_dir, KEYWORD_PREFIX)
+    if chunks.get("model") != MODEL_NAME:
+        raise ValueError(f"Snapshot was built with {chunks.get('model')}, expected {MODEL_NAME}")
+    if embeddings.shape[0] != len(chunks["ids"]):
+        raise ValueError("Snapshot embeddings and chunk ids are out of sync")
+    return embeddings, chunks
+
+
+def restore_snapshot(db: ChunkedCandidateDB, embeddings: np.ndarray, chunks: Dict[str, Any], batch_size: int = 1024) -> int:
+    """
+    Makes `db.collection` match a loaded snapshot without running the model:
+    missing chunks are upserted with their stored vectors and chunks that
+    are not in the snapshot are deleted. Returns the number of chunks written.
+    """
+    ids: List[str] = chunks["ids"]
+    wanted = set(ids)
+    existing = set(db.collection.get(include=[])["ids"])
+
+    db._delete_chunks([doc_id for doc_id in existing if doc_id not in wanted])
+
+    missing = [i for i, doc_id in enumerate(ids) if doc_id not in existing]
+    for start in range(0, len(missing), batch_size):
+        rows = missing[start:start + batch_size]
+        db._store_chunks(
+            [ids[i] for i in rows],
+            [chunks["documents"][i] for i in rows],
+            np.asarray(embeddings[rows]),
+            [chunks["metadatas"][i] for i in rows]
+        )
+    db._refresh_keyword_model()
+    db._refresh_candidate_index()
+    return len(missing)
+
+
+def can_attach(db: ChunkedCandidateDB, chunks: Dict[str, Any]) -> bool:
+    """
+    attach_snapshot() needs a snapshot of the current layout (older ones are
+    rebuilt by the API) and an empty float32 numpy index.
+    """
+    if chunks.get("layout") != SNAPSHOT_LAYOUT or db.backend != "numpy" or db.collection.count():
+        return False
+    return db.vector_dtype == "float32"
+
+
+def attach_snapshot(db: ChunkedCandidateDB, embeddings: np.ndarray, chunks: Dict[str, Any]) -> int:
+    """
+    Points db's numpy index at the snapshot files instead of copying them:
+    each section partition is a read-only NumpyCollection over its slice of
+    the memory-mapped matrix (see NumpyCollection.from_shared), and BM25
+    lookups use the snapshot's mapped postings when it has them. The
+    candidate index (two-stage retrieval) and, for retrieval="dense", the
+    TF-IDF vectorizer are still built per process. Returns the number of
+    chunks attached.
+    """
+    if not can_attach(db, chunks):
+        raise ValueError("attach_snapshot needs a mapped snapshot and an empty float32 numpy backend")
+    ids, documents, metadatas = chunks["ids"], chunks["documents"], chunks["metadatas"]
+    collection = db.collection
+    if isinstance(collection, PartitionedCollection):
+        for section, (start, end) in chunks["sections"].items():
+            rows = range(start, end)
+            collection.set_partition(section, NumpyCollection.from_shared(
+                embeddings[start:end], _RowSlice(ids, rows), _RowSlice(documents, rows), _RowSlice(metadatas, rows),
+                _SliceRowIndex(ids, rows)
+            ))
+    else:
+        db.collection = NumpyCollection.from_shared(embeddings, ids, documents, metadatas,
+                                                    _SliceRowIndex(ids, range(len(ids))))
+    db.index_version += 1
+    db.use_keyword_index(MappedInvertedIndex(chunks["keyword_prefix"], ids, chunks["sections"],
+                                             db.keyword_index.k1, db.keyword_index.b))
+    db._refresh_keyword_model()
+    db._refresh_candidate_index()
+    return len(ids)
+
+
+class _RowSlice:
+    """Rows `rows` (a range) of a mapped sequence, without copying it."""
+
+    def __init__(self, values, rows: range):
+        self._values = values
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, i: int):
+        return self._values[self._rows[i]]
+
+    def __iter__(self):
+        return (self._values[row] for row in self._rows)
+
+    def take(self, rows) -> List[Any]:
+        return self._values.take(np.asarray(rows, dtype=np.int64) + self._rows.start)
+
+    def column(self, key: str) -> np.ndarray:
+        return self._values.column(key, self._rows.start, self._rows.stop)
+
+
+class _SliceRowIndex:
+    """id -> row within `rows` of mapped ids, by MappedStrings.find() instead of a dict."""
+
+    def __init__(self, ids: MappedStrings, rows: range):
+        self._ids = ids
+        self._rows = rows
+
+    def get(self, doc_id: str, default=None):
+        row = self._ids.find(doc_id)
+        if self._rows.start <= row < self._rows.stop:
+            return row - self._rows.start
+        return default
+
+    def __contains__(self, doc_id: str) -> bool:
+        return self.get(doc_id) is not None
+
+    def __getitem__(self, doc_id: str) -> int:
+        row = self.get(doc_id)
+        if row is None:
+            raise KeyError(doc_id)
+        return row
+
+
+if __name__ == "__main__":
+    json_path = sys.argv[1] if len(sys.argv) > 1 else "candidates.json"
+    snapshot_dir = sys.argv[2] if len(sys.argv) > 2 else "./snapshot"
+    db = ChunkedCandidateDB(persist_directory=None)
+    count = build_snapshot(db, json_path, snapshot_dir)
+    print(f"Wrote {count} chunk embeddings to {snapshot_dir}")
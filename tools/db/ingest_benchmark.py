@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from synthetic_profiles import iter_synthetic_profiles, load_section_stats, write_profiles
+
+###############################################################################
+# Ingest scaling benchmark
+#
+# Ingests synthetic corpora (see synthetic_profiles.py; section rates and
+# entry counts follow --stats-from) of increasing size into a fresh index
+# each and records, per size:
+#   - profiles, chunks and chunks/sec (from the ingest stats)
+#   - peak RSS of the ingesting process (and of its workers with --workers)
+#   - on-disk index size: the Chroma persist directory, or for the numpy
+#     backend the in-memory vector bytes (it is not persisted)
+#   - latency of a few searches against the finished index
+# Every size runs in its own subprocess, so peak RSS is per size and a size
+# that dies (out of memory, killed by --timeout) is recorded as failed
+# instead of ending the run: the first failing size is where the design
+# falls over.
+#
+#   python ingest_benchmark.py --sizes 10000,100000,1000000 --out ingest.json
+###############################################################################
+
+PROBE_QUERIES = [
+    "machine learning research",
+    "industry experience in distributed systems",
+    "publications in computer vision and startup founder",
+]
+
+
+def _peak_rss_bytes(who: int) -> int:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    peak = resource.getrusage(who).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _dir_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _vector_bytes(collection) -> int:
+    parts = getattr(collection, "partitions", None)
+    if parts is not None:
+        return sum(p.nbytes for p in parts.values())
+    return getattr(collection, "nbytes", 0)
+
+
+def measure_size(size: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """Ingests `size` synthetic profiles into a fresh index under args.workdir and measures it."""
+    # Imported here so the parent process never loads the model.
+    from chunked_candidates_final import ChunkedCandidateDB
+    from profile_stream import iter_profiles
+
+    run_dir = os.path.join(args.workdir, f"size_{size}")
+    shutil.rmtree(run_dir, ignore_errors=True)
+    os.makedirs(run_dir)
+    persist_dir = os.path.join(run_dir, "chroma") if args.backend == "chroma" else None
+
+    stats = load_section_stats(args.stats_from)
+    if args.from_file:
+        # Includes JSONL parsing in the measurement, as a real dump would.
+        source_path = os.path.join(run_dir, "profiles.jsonl")
+        write_profiles(source_path, size, args.seed, stats)
+        profiles = iter_profiles(source_path)
+    else:
+        profiles = iter_synthetic_profiles(size, args.seed, stats=stats)
+
+    db = ChunkedCandidateDB(persist_directory=persist_dir, backend=args.backend,
+                            vector_dtype=args.vector_dtype, result_cache_size=0)
+    if args.workers:
+        stats = db.ingest_candidates_parallel(profiles, workers=args.workers, batch_size=args.batch_size)
+    else:
+        stats = db.ingest_candidates(profiles, batch_size=args.batch_size)
+
+    search_ms: List[float] = []
+    for query in PROBE_QUERIES:
+        started = time.perf_counter()
+        db.multi_subquery_search(query)
+        search_ms.append((time.perf_counter() - started) * 1000.0)
+
+    return {
+        "size": size,
+        "status": "ok",
+        "profiles": stats["profiles"],
+        "chunks": stats["chunks"],
+        "encoded": stats["encoded"],
+        "ingest_seconds": stats["seconds"],
+        "chunks_per_sec": stats["chunks_per_sec"],
+        "profiles_per_sec": stats["profiles"] / stats["seconds"] if stats["seconds"] > 0 else 0.0,
+        "peak_rss_bytes": _peak_rss_bytes(resource.RUSAGE_SELF),
+        "peak_worker_rss_bytes": _peak_rss_bytes(resource.RUSAGE_CHILDREN) if args.workers else 0,
+        "index_bytes": _dir_bytes(persist_dir) if persist_dir else _vector_bytes(db.collection),
+        "index_on_disk": bool(persist_dir),
+        "search_ms": search_ms,
+    }
+
+
+def run_size(size: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """Runs measure_size() in a child process; a crash or timeout becomes a failed row."""
+    fd, result_path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    command = [sys.executable, os.path.abspath(__file__), "--child", str(size), "--child-out", result_path,
+               "--backend", args.backend, "--vector-dtype", args.vector_dtype, "--workdir", args.workdir,
+               "--batch-size", str(args.batch_size), "--workers", str(args.workers), "--seed", str(args.seed),
+               "--stats-from", args.stats_from]
+    if args.from_file:
+        command.append("--from-file")
+    started = time.perf_counter()
+    try:
+        completed = subprocess.run(command, timeout=args.timeout or None)
+        if completed.returncode != 0:
+            # A negative code is the signal that killed it (-9: most likely the OOM killer).
+            return {"size": size, "status": "failed", "returncode": completed.returncode,
+                    "seconds": time.perf_counter() - started}
+        with open(result_path) as f:
+            return json.load(f)
+    except subprocess.TimeoutExpired:
+        return {"size": size, "status": "timeout", "seconds": time.perf_counter() - started}
+    finally:
+        os.remove(result_path)
+        if not args.keep:
+            shutil.rmtree(os.path.join(args.workdir, f"size_{size}"), ignore_errors=True)
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\nconfig: {json.dumps(report['config'])}\n")
+    print(f"{'profiles':>10} {'chunks':>10} {'chunks/s':>10} {'seconds':>10} {'peak RSS MB':>12} "
+          f"{'index MB':>10} {'search ms':>10}")
+    for row in report["sizes"]:
+        if row["status"] != "ok":
+            print(f"{row['size']:>10} {row['status']}")
+            continue
+        print(f"{row['profiles']:>10} {row['chunks']:>10} {row['chunks_per_sec']:>10.0f} "
+              f"{row['ingest_seconds']:>10.1f} {row['peak_rss_bytes'] / 2**20:>12.0f} "
+              f"{row['index_bytes'] / 2**20:>10.1f} {max(row['search_ms']):>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest throughput / memory / index size at increasing corpus sizes")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated profile counts")
+    parser.add_argument("--backend", default="chroma", choices=["chroma", "numpy"])
+    parser.add_argument("--vector-dtype", default="float32", choices=["float32", "float16", "int8"])
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=0, help="use ingest_candidates_parallel with this many processes")
+    parser.add_argument("--from-file", action="store_true", help="write the corpus to JSONL first and stream it back")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stats-from", default="candidates.json",
+                        help="profile file whose section rates / entry counts the corpus follows (built-in stats if missing)")
+    parser.add_argument("--timeout", type=float, default=0, help="seconds allowed per size (0: no limit)")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "ingest_benchmark"))
+    parser.add_argument("--keep", action="store_true", help="keep the per-size indexes")
+    parser.add_argument("--stop-on-failure", action="store_true", help="skip larger sizes after the first failure")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--child-out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        result = measure_size(args.child, args)
+        with open(args.child_out, "w") as f:
+            json.dump(result, f)
+        sys.exit(0)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    report: Dict[str, Any] = {
+        "config": {
+            "backend": args.backend, "vector_dtype": args.vector_dtype, "batch_size": args.batch_size,
+            "workers": args.workers, "from_file": args.from_file, "seed": args.seed,
+            "stats_from": args.stats_from if os.path.exists(args.stats_from) else "built-in",
+        },
+        "environment": {"python": platform.python_version(), "machine": platform.machine(),
+                        "cpus": os.cpu_count()},
+        "sizes": [],
+    }
+    for size in sorted(int(s) for s in args.sizes.split(",") if s.strip()):
+        print(f"--- {size} profiles ---")
+        row = run_size(size, args)
+        report["sizes"].append(row)
+        if args.out:
+            # Rewritten after every size so a long run still leaves partial results.
+            with open(args.out, "w") as f:
+                json.dump(report, f, indent=2)
+        if row["status"] != "ok" and args.stop_on_failure:
+            break
+    print_report(report)
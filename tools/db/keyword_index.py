@@ -0,0 +1,215 @@
+import bisect
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from mmap_store import MappedStrings, write_strings
+
+###############################################################################
+# Token-level inverted index over chunk documents
+#
+# Maps each term to the ids of the chunks that contain it as a whole token
+# (with the term frequency). Tokens follow scikit-learn's default
+# TfidfVectorizer rules (lowercased, runs of 2+ word characters), so TF-IDF
+# keywords can be looked up directly and "ml" no longer matches inside
+# "html". The same postings back the BM25 leg of hybrid retrieval.
+#
+# write_postings() stores the postings of an embedding snapshot as flat
+# arrays next to it:
+#   <prefix>terms.bin     the distinct terms, sorted (mmap_store strings)
+#   <prefix>offsets.npy   int64, postings of term i are [offsets[i], offsets[i + 1])
+#   <prefix>rows.npy      int32 snapshot row of every posting
+#   <prefix>tfs.npy       int32 term frequency of every posting
+#   <prefix>doc_len.npy   int32 token count of every row
+# MappedInvertedIndex answers the same lookups from the memory-mapped
+# arrays, so API workers attached to one snapshot share a single copy.
+###############################################################################
+
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class InvertedIndex:
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Set[str]] = {}
+        self._doc_len: Dict[str, int] = {}
+        self._doc_section: Dict[str, Any] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def clear(self) -> None:
+        self.postings.clear()
+        self._doc_terms.clear()
+        self._doc_len.clear()
+        self._doc_section.clear()
+        self._total_len = 0
+
+    def add(self, doc_ids: Iterable[str], documents: Iterable[str], metadatas: Optional[Iterable[Dict[str, Any]]] = None) -> None:
+        doc_ids = list(doc_ids)
+        if metadatas is None:
+            metadatas = [{} for _ in doc_ids]
+        for doc_id, document, metadata in zip(doc_ids, documents, metadatas):
+            if doc_id in self._doc_terms:
+                self.remove([doc_id])
+            tokens = tokenize(document)
+            counts = Counter(tokens)
+            self._doc_terms[doc_id] = set(counts)
+            self._doc_len[doc_id] = len(tokens)
+            self._doc_section[doc_id] = (metadata or {}).get("section")
+            self._total_len += len(tokens)
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_ids: Iterable[str]) -> None:
+        for doc_id in doc_ids:
+            for term in self._doc_terms.pop(doc_id, ()):
+                posting = self.postings.get(term)
+                if posting is not None:
+                    posting.pop(doc_id, None)
+                    if not posting:
+                        del self.postings[term]
+            self._total_len -= self._doc_len.pop(doc_id, 0)
+            self._doc_section.pop(doc_id, None)
+
+    def hit_matrix(self, doc_ids: List[str], terms: List[str]) -> np.ndarray:
+        """Boolean matrix (len(doc_ids) x len(terms)): does chunk i contain term j."""
+        hits = np.zeros((len(doc_ids), len(terms)), dtype=bool)
+        for j, term in enumerate(terms):
+            posting = self.postings.get(term)
+            if posting:
+                hits[:, j] = [doc_id in posting for doc_id in doc_ids]
+        return hits
+
+    def bm25(self, terms: Iterable[str], sections: Optional[Set[str]] = None) -> Dict[str, float]:
+        """
+        Okapi BM25 score of every chunk that contains at least one of `terms`,
+        optionally restricted to chunks whose section is in `sections`.
+        """
+        n_docs = len(self._doc_terms)
+        if n_docs == 0:
+            return {}
+        avg_len = max(self._total_len / n_docs, 1.0)
+        scores: Dict[str, float] = {}
+        for term in set(terms):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1.0 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                if sections is not None and self._doc_section.get(doc_id) not in sections:
+                    continue
+                norm = tf + self.k1 * (1.0 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1.0) / norm
+        return scores
+
+
+def write_postings(prefix: str, documents: Iterable[str]) -> int:
+    """Writes the postings of `documents` (row i = document i) as flat arrays. Returns the number of terms."""
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    doc_len: List[int] = []
+    for row, document in enumerate(documents):
+        tokens = tokenize(document)
+        doc_len.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            postings.setdefault(term, []).append((row, tf))
+    terms = sorted(postings)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(postings[term]) for term in terms])
+    rows = np.empty(int(offsets[-1]), dtype=np.int32)
+    tfs = np.empty(int(offsets[-1]), dtype=np.int32)
+    for i, term in enumerate(terms):
+        entries = np.asarray(postings[term], dtype=np.int32)
+        rows[offsets[i]:offsets[i + 1]] = entries[:, 0]
+        tfs[offsets[i]:offsets[i + 1]] = entries[:, 1]
+    write_strings(prefix + "terms.bin", terms)
+    np.save(prefix + "offsets.npy", offsets)
+    np.save(prefix + "rows.npy", rows)
+    np.save(prefix + "tfs.npy", tfs)
+    np.save(prefix + "doc_len.npy", np.asarray(doc_len, dtype=np.int32))
+    return len(terms)
+
+
+class MappedInvertedIndex:
+    """
+    Read-only InvertedIndex over postings written by write_postings(). `ids`
+    maps snapshot rows to chunk ids; `sections` is {section: (first row,
+    end row)} of the section-sorted snapshot.
+    """
+
+    # Read-only: ChunkedCandidateDB swaps it for a private InvertedIndex on the first write.
+    shared = True
+
+    def __init__(self, prefix: str, ids, sections: Dict[str, Sequence[int]], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._terms = MappedStrings(prefix + "terms.bin")
+        self._offsets = np.load(prefix + "offsets.npy", mmap_mode="r").view(np.ndarray)
+        self._rows = np.load(prefix + "rows.npy", mmap_mode="r").view(np.ndarray)
+        self._tfs = np.load(prefix + "tfs.npy", mmap_mode="r").view(np.ndarray)
+        self._doc_len = np.load(prefix + "doc_len.npy", mmap_mode="r").view(np.ndarray)
+        self._ids = ids
+        self._sections = {section: (int(bounds[0]), int(bounds[1])) for section, bounds in sections.items()}
+        self._avg_len = max(float(self._doc_len.sum()) / len(self._doc_len), 1.0) if len(self._doc_len) else 1.0
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def _posting(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(rows, term frequencies) of `term`, or None if no row contains it."""
+        i = bisect.bisect_left(self._terms, term)
+        if i == len(self._terms) or self._terms[i] != term:
+            return None
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._rows[start:end], self._tfs[start:end]
+
+    def hit_matrix(self, doc_ids: List[str], terms: List[str]) -> np.ndarray:
+        """Boolean matrix (len(doc_ids) x len(terms)): does chunk i contain term j."""
+        hits = np.zeros((len(doc_ids), len(terms)), dtype=bool)
+        for j, term in enumerate(terms):
+            posting = self._posting(term)
+            if posting is not None:
+                containing = set(self._ids.take(posting[0]))
+                hits[:, j] = [doc_id in containing for doc_id in doc_ids]
+        return hits
+
+    def bm25(self, terms: Iterable[str], sections: Optional[Set[str]] = None) -> Dict[str, float]:
+        """Same scores as InvertedIndex.bm25, one array pass per term."""
+        n_docs = len(self._doc_len)
+        if n_docs == 0:
+            return {}
+        matched_rows: List[np.ndarray] = []
+        matched_scores: List[np.ndarray] = []
+        for term in set(terms):
+            posting = self._posting(term)
+            if posting is None:
+                continue
+            rows, tfs = posting
+            idf = math.log(1.0 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            if sections is not None:
+                keep = np.zeros(len(rows), dtype=bool)
+                for section in sections:
+                    bounds = self._sections.get(section)
+                    if bounds is not None:
+                        keep |= (rows >= bounds[0]) & (rows < bounds[1])
+                rows, tfs = rows[keep], tfs[keep]
+            tf = tfs.astype(np.float64)
+            norm = tf + self.k1 * (1.0 - self.b + self.b * self._doc_len[rows] / self._avg_len)
+            matched_rows.append(rows)
+            matched_scores.append(idf * tf * (self.k1 + 1.0) / norm)
+        if not matched_rows:
+            return {}
+        unique_rows, inverse = np.unique(np.concatenate(matched_rows), return_inverse=True)
+        totals = np.zeros(len(unique_rows))
+        np.add.at(totals, inverse.reshape(-1), np.concatenate(matched_scores))
+        return dict(zip(self._ids.take(unique_rows), totals.tolist()))
@@ -0,0 +1,163 @@
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List
+
+import numpy as np
+
+###############################################################################
+# Memory-mapped string and metadata columns
+#
+# Chunk ids, documents and metadata written next to an embedding snapshot in
+# a layout that can be memory-mapped instead of parsed into Python objects,
+# so several processes (uvicorn workers) reading the same snapshot share one
+# copy in the page cache:
+#   <name>.bin           UTF-8 strings back to back
+#   <name>.offsets.npy   int64 end offset of every string
+# and, per metadata key, an int32 code per row (-1: key missing) into a
+# string table of the JSON-encoded distinct values. write_string_index()
+# adds <name>.order.npy (rows in sorted string order) so MappedStrings.find()
+# can look a string up by binary search instead of a per-process dict.
+#
+# MappedStrings and MappedMetadata are read-only sequences that decode a row
+# only when it is accessed (a metadata key's value table is decoded once, on
+# first use); NumpyCollection.from_shared() uses them in place of its id /
+# document / metadata lists.
+###############################################################################
+
+
+def write_strings(path: str, strings: Iterable[str]) -> int:
+    """Writes `strings` to path (blob) and path + '.offsets.npy'. Returns the count."""
+    offsets: List[int] = []
+    end = 0
+    with open(path, "wb") as f:
+        for value in strings:
+            data = value.encode("utf-8")
+            f.write(data)
+            end += len(data)
+            offsets.append(end)
+    np.save(path + ".offsets.npy", np.asarray(offsets, dtype=np.int64))
+    return len(offsets)
+
+
+def write_string_index(path: str, strings: List[str]) -> None:
+    """Writes path + '.order.npy': the rows of `strings` in sorted string order (see MappedStrings.find)."""
+    order = sorted(range(len(strings)), key=strings.__getitem__)
+    np.save(path + ".order.npy", np.asarray(order, dtype=np.int64))
+
+
+class MappedStrings:
+    def __init__(self, path: str):
+        # Plain ndarray views of the mappings: indexing a np.memmap row by row
+        # goes through its Python-level __getitem__.
+        self._offsets = np.load(path + ".offsets.npy", mmap_mode="r").view(np.ndarray)
+        # np.memmap cannot map an empty file.
+        self._blob = (np.memmap(path, dtype=np.uint8, mode="r").view(np.ndarray)
+                      if os.path.getsize(path) else np.empty(0, np.uint8))
+        self._view = memoryview(self._blob)
+        self._order = (np.load(path + ".order.npy", mmap_mode="r").view(np.ndarray)
+                       if os.path.exists(path + ".order.npy") else None)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self._offsets)
+        start = int(self._offsets[i - 1]) if i > 0 else 0
+        return str(self._view[start:int(self._offsets[i])], "utf-8")
+
+    def find(self, value: str) -> int:
+        """Row of `value` (-1 if absent); needs the write_string_index() file."""
+        if self._order is None:
+            raise ValueError("No string index; write it with write_string_index()")
+        order = self._order
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self[int(order[mid])] < value:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(order) and self[int(order[lo])] == value:
+            return int(order[lo])
+        return -1
+
+    def take(self, rows) -> List[str]:
+        """The strings at `rows`, in order (one offsets lookup for all of them)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        ends = self._offsets[rows].tolist()
+        starts = np.where(rows > 0, self._offsets[rows - 1], 0).tolist()
+        view = self._view
+        return [str(view[start:end], "utf-8") for start, end in zip(starts, ends)]
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[i] for i in range(len(self)))
+
+
+def write_metadata(prefix: str, metadatas: List[Dict[str, Any]]) -> List[str]:
+    """Writes one code column and value table per metadata key. Returns the keys."""
+    keys = sorted({key for metadata in metadatas for key in metadata})
+    for key in keys:
+        table: Dict[str, int] = {}
+        codes = np.full(len(metadatas), -1, dtype=np.int32)
+        for row, metadata in enumerate(metadatas):
+            if key in metadata:
+                value = json.dumps(metadata[key])
+                codes[row] = table.setdefault(value, len(table))
+        np.save(f"{prefix}{key}.codes.npy", codes)
+        write_strings(f"{prefix}{key}.values.bin", table)
+    return keys
+
+
+class MappedMetadata:
+    def __init__(self, prefix: str, keys: List[str]):
+        self.keys = list(keys)
+        self._codes = {key: np.load(f"{prefix}{key}.codes.npy", mmap_mode="r").view(np.ndarray) for key in self.keys}
+        self._values = {key: MappedStrings(f"{prefix}{key}.values.bin") for key in self.keys}
+        # key -> decoded value table, built on first use of the key
+        self._tables: Dict[str, List[Any]] = {}
+        self._count = len(self._codes[self.keys[0]]) if self.keys else 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _table(self, key: str) -> List[Any]:
+        table = self._tables.get(key)
+        if table is None:
+            table = [json.loads(value) for value in self._values[key]]
+            self._tables[key] = table
+        return table
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        metadata = {}
+        for key in self.keys:
+            code = int(self._codes[key][row])
+            if code >= 0:
+                metadata[key] = self._table(key)[code]
+        return metadata
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self[row] for row in range(self._count))
+
+    def take(self, rows) -> List[Dict[str, Any]]:
+        """The metadata of `rows`, in order."""
+        rows = np.asarray(rows, dtype=np.int64)
+        metadatas: List[Dict[str, Any]] = [{} for _ in range(len(rows))]
+        for key in self.keys:
+            table = self._table(key)
+            for metadata, code in zip(metadatas, self._codes[key][rows].tolist()):
+                if code >= 0:
+                    metadata[key] = table[code]
+        return metadatas
+
+    def column(self, key: str, start: int = 0, stop: int = None) -> np.ndarray:
+        """Values of `key` for rows [start, stop) (None where missing)."""
+        stop = self._count if stop is None else stop
+        if key not in self._codes:
+            return np.full(stop - start, None, dtype=object)
+        # One extra slot at the end, so code -1 picks None.
+        decoded = self._table(key)
+        table = np.empty(len(decoded) + 1, dtype=object)
+        for code, value in enumerate(decoded):
+            table[code] = value
+        return table[np.asarray(self._codes[key][start:stop])]
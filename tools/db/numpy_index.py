@@ -0,0 +1,392 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+###############################################################################
+# In-process exact vector index
+#
+# NumpyCollection implements the subset of the Chroma Collection API that
+# ChunkedCandidateDB uses (upsert / delete / get / query / count), so it can
+# be dropped in as `db.collection`. Vectors are kept L2-normalized in one
+# float32 matrix and search is an exact matrix product + argpartition, which
+# at a few thousand 384-dim chunks is faster than going through HNSW.
+#
+# Distances are reported as squared L2 between the normalized vectors
+# (2 - 2 * cosine), which is what Chroma's default "l2" space returns for
+# normalized MiniLM embeddings, so scores are interchangeable between the
+# two backends.
+#
+# vector_dtype="float16" or "int8" stores the matrix in a compact form
+# (int8 with one float32 scale per vector: v ~= q * scale) and scores queries
+# against it block by block, so only a block at a time is widened to float32.
+# Halves / quarters vector memory at a small recall cost; see
+# quantization_report.py for the measured top-k overlap.
+#
+# NumpyCollection.from_shared() wraps vectors, ids, documents and metadata
+# that live outside the process heap (the memory-mapped files of an
+# embedding snapshot, see mmap_store.py) without copying them, so every
+# process attached to the same snapshot shares one copy. Such a collection
+# is read-only until the first write, which copies it into private memory.
+###############################################################################
+
+VECTOR_DTYPES = ("float32", "float16", "int8")
+
+# Rows widened to float32 at a time when scoring a compact matrix.
+_SCORE_BLOCK = 8192
+
+# Cached `where` masks kept between writes (per-query filters such as a
+# candidate shortlist would otherwise grow the cache without bound).
+_MAX_CACHED_MASKS = 256
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _take(values, rows) -> List[Any]:
+    # Mapped snapshot columns (mmap_store) fetch many rows in one call.
+    if hasattr(values, "take"):
+        return values.take(rows)
+    return [values[r] for r in rows]
+
+
+def _quantize(vectors: np.ndarray, vector_dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Returns (stored vectors, per-vector scales or None) for normalized float32 input."""
+    if vector_dtype == "float16":
+        return vectors.astype(np.float16), None
+    if vector_dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+    return vectors, None
+
+
+class NumpyCollection:
+    def __init__(self, initial_capacity: int = 1024, vector_dtype: str = "float32"):
+        if vector_dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unsupported vector dtype: {vector_dtype}")
+        self._initial_capacity = initial_capacity
+        self.vector_dtype = vector_dtype
+        self._matrix: Optional[np.ndarray] = None
+        # int8 only: one dequantization scale per row.
+        self._scales: Optional[np.ndarray] = None
+        self._count = 0
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._row_of: Optional[Dict[str, int]] = {}
+        # Shared collections only: id -> row lookups without a dict (from_shared).
+        self._shared_rows = None
+        # True while the rows are borrowed from from_shared(); see _detach().
+        self.shared = False
+        # Metadata columns and boolean masks for `where` filters (e.g. one
+        # per section), computed on first use and dropped on every write.
+        self._columns: Dict[str, np.ndarray] = {}
+        self._value_rows: Dict[str, Dict[Any, np.ndarray]] = {}
+        self._masks: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_shared(cls, embeddings: np.ndarray, ids, documents, metadatas, row_index=None) -> "NumpyCollection":
+        """
+        Read-only collection over float32, already L2-normalized `embeddings`
+        (e.g. a memory map) and sequences of ids / documents / metadatas that
+        support len() and integer indexing. Nothing is copied. Lookups by id
+        use `row_index` (a mapping-like object with `in` and [], e.g. over a
+        sorted id file) when given; otherwise an id -> row dict is built on
+        the first such lookup.
+        """
+        if embeddings.dtype != np.float32 or embeddings.ndim != 2 or embeddings.shape[0] != len(ids):
+            raise ValueError("Shared embeddings must be a float32 matrix with one row per id")
+        collection = cls(vector_dtype="float32")
+        collection._matrix = embeddings
+        collection._count = len(ids)
+        collection._ids = ids
+        collection._documents = documents
+        collection._metadatas = metadatas
+        collection._row_of = None
+        collection._shared_rows = row_index
+        collection.shared = True
+        return collection
+
+    def _row_index(self) -> Dict[str, int]:
+        if self._row_of is None:
+            if self._shared_rows is not None:
+                return self._shared_rows
+            self._row_of = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        return self._row_of
+
+    # ------------------------------------------------------------------ writes
+
+    def _detach(self) -> None:
+        """Copies a shared collection into private, writable memory (before its first write)."""
+        if not self.shared:
+            return
+        if self._row_of is None:
+            self._row_of = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._matrix = np.array(self._matrix[:self._count], dtype=np.float32)
+        self._ids = list(self._ids)
+        self._documents = list(self._documents)
+        self._metadatas = list(self._metadatas)
+        self._shared_rows = None
+        self.shared = False
+
+    def _invalidate(self) -> None:
+        self._columns.clear()
+        self._value_rows.clear()
+        self._masks.clear()
+
+    def _ensure_capacity(self, extra: int, dim: int) -> None:
+        needed = self._count + extra
+        if self._matrix is not None and needed <= self._matrix.shape[0]:
+            return
+        capacity = max(needed, self._initial_capacity if self._matrix is None else 2 * self._matrix.shape[0])
+        grown = np.empty((capacity, dim), dtype=np.dtype(self.vector_dtype))
+        scales = np.ones(capacity, dtype=np.float32) if self.vector_dtype == "int8" else None
+        if self._matrix is not None:
+            grown[:self._count] = self._matrix[:self._count]
+            if scales is not None:
+                scales[:self._count] = self._scales[:self._count]
+        self._matrix = grown
+        self._scales = scales
+
+    def upsert(self, ids: List[str], embeddings, documents: List[str] = None, metadatas: List[Dict[str, Any]] = None) -> None:
+        self._detach()
+        vectors, scales = _quantize(_normalize(embeddings), self.vector_dtype)
+        if documents is None:
+            documents = [""] * len(ids)
+        if metadatas is None:
+            metadatas = [{} for _ in ids]
+        self._ensure_capacity(len(ids), vectors.shape[1])
+        for i, (doc_id, document, metadata) in enumerate(zip(ids, documents, metadatas)):
+            row = self._row_of.get(doc_id)
+            if row is None:
+                row = self._count
+                self._count += 1
+                self._row_of[doc_id] = row
+                self._ids.append(doc_id)
+                self._documents.append(document)
+                self._metadatas.append(dict(metadata))
+            else:
+                self._documents[row] = document
+                self._metadatas[row] = dict(metadata)
+            self._matrix[row] = vectors[i]
+            if scales is not None:
+                self._scales[row] = scales[i]
+        self._invalidate()
+
+    def delete(self, ids: List[str]) -> None:
+        if self.shared and not any(doc_id in self._row_index() for doc_id in ids):
+            return
+        self._detach()
+        for doc_id in ids:
+            row = self._row_of.pop(doc_id, None)
+            if row is None:
+                continue
+            # Swap the last row into the hole so the matrix stays dense.
+            last = self._count - 1
+            if row != last:
+                moved_id = self._ids[last]
+                self._matrix[row] = self._matrix[last]
+                if self._scales is not None:
+                    self._scales[row] = self._scales[last]
+                self._ids[row] = moved_id
+                self._documents[row] = self._documents[last]
+                self._metadatas[row] = self._metadatas[last]
+                self._row_of[moved_id] = row
+            self._ids.pop()
+            self._documents.pop()
+            self._metadatas.pop()
+            self._count -= 1
+        self._invalidate()
+
+    # ------------------------------------------------------------------- reads
+
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """All stored vectors as float32 (dequantized for compact dtypes)."""
+        if self._matrix is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._vectors(np.arange(self._count))
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the stored vectors (and scales) of live rows."""
+        if self._matrix is None:
+            return 0
+        size = self._matrix[:self._count].nbytes
+        if self._scales is not None:
+            size += self._scales[:self._count].nbytes
+        return size
+
+    def _vectors(self, rows: np.ndarray) -> np.ndarray:
+        vectors = self._matrix[rows].astype(np.float32)
+        if self._scales is not None:
+            vectors *= self._scales[rows][:, None]
+        return vectors
+
+    def _scores(self, queries: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """
+        Cosine scores (queries x rows) against the stored vectors. float32 is
+        one matrix product; compact dtypes are widened one block at a time and
+        int8 products are rescaled per row.
+        """
+        matrix = self._matrix[:self._count]
+        scales = None if self._scales is None else self._scales[:self._count]
+        if self.vector_dtype == "float32":
+            return queries @ (matrix if rows is None else matrix[rows]).T
+        n = self._count if rows is None else len(rows)
+        scores = np.empty((len(queries), n), dtype=np.float32)
+        for start in range(0, n, _SCORE_BLOCK):
+            block_rows = slice(start, start + _SCORE_BLOCK) if rows is None else rows[start:start + _SCORE_BLOCK]
+            block = queries @ matrix[block_rows].astype(np.float32).T
+            if scales is not None:
+                block *= scales[block_rows]
+            scores[:, start:start + block.shape[1]] = block
+        return scores
+
+    def _column(self, key: str) -> np.ndarray:
+        column = self._columns.get(key)
+        if column is None:
+            if hasattr(self._metadatas, "column"):
+                # Mapped metadata decodes each distinct value once.
+                column = self._metadatas.column(key)
+            else:
+                column = np.empty(self._count, dtype=object)
+                column[:] = [m.get(key) for m in self._metadatas]
+            self._columns[key] = column
+        return column
+
+    def _rows_by_value(self, key: str) -> Dict[Any, np.ndarray]:
+        """value -> rows holding it, so `$in` over a few values (e.g. a candidate
+        shortlist) touches only the matching rows instead of the whole column."""
+        groups = self._value_rows.get(key)
+        if groups is None:
+            rows: Dict[Any, List[int]] = {}
+            for row, value in enumerate(self._column(key)):
+                rows.setdefault(value, []).append(row)
+            groups = {value: np.asarray(r, dtype=np.int64) for value, r in rows.items()}
+            self._value_rows[key] = groups
+        return groups
+
+    def _eval_where(self, where: Dict[str, Any]) -> np.ndarray:
+        mask = np.ones(self._count, dtype=bool)
+        for key, cond in where.items():
+            if key == "$and":
+                for sub in cond:
+                    mask &= self._eval_where(sub)
+            elif key == "$or":
+                any_mask = np.zeros(self._count, dtype=bool)
+                for sub in cond:
+                    any_mask |= self._eval_where(sub)
+                mask &= any_mask
+            else:
+                column = self._column(key)
+                if isinstance(cond, dict):
+                    for op, value in cond.items():
+                        if op == "$eq":
+                            mask &= column == value
+                        elif op == "$ne":
+                            mask &= column != value
+                        elif op == "$in":
+                            groups = self._rows_by_value(key)
+                            matched = [groups[v] for v in value if v in groups]
+                            in_mask = np.zeros(self._count, dtype=bool)
+                            if matched:
+                                in_mask[np.concatenate(matched)] = True
+                            mask &= in_mask
+                        elif op == "$nin":
+                            mask &= ~np.isin(column, list(value))
+                        else:
+                            raise ValueError(f"Unsupported where operator: {op}")
+                else:
+                    mask &= column == cond
+        return mask
+
+    def _mask(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        if not where:
+            return None
+        key = json.dumps(where, sort_keys=True)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = self._eval_where(where)
+            if len(self._masks) >= _MAX_CACHED_MASKS:
+                self._masks.clear()
+            self._masks[key] = mask
+        return mask
+
+    def _rows_payload(self, rows, include: List[str]) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"ids": _take(self._ids, rows)}
+        if "documents" in include:
+            payload["documents"] = _take(self._documents, rows)
+        if "metadatas" in include:
+            payload["metadatas"] = _take(self._metadatas, rows)
+        if "embeddings" in include:
+            payload["embeddings"] = self._vectors(np.asarray(rows, dtype=np.int64))
+        return payload
+
+    def get(self, ids: List[str] = None, where: Dict[str, Any] = None, include: List[str] = ("documents", "metadatas")) -> Dict[str, Any]:
+        if ids is not None:
+            row_of = self._row_index()
+            rows = [row_of[i] for i in ids if i in row_of]
+            mask = self._mask(where)
+            if mask is not None:
+                rows = [r for r in rows if mask[r]]
+        else:
+            mask = self._mask(where)
+            rows = list(range(self._count)) if mask is None else np.flatnonzero(mask).tolist()
+        return self._rows_payload(rows, list(include))
+
+    def query_rows(self, query_embeddings, n_results: int = 10,
+                   where: Dict[str, Any] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Per query: (rows, distances) of the n_results nearest rows, best first.
+        No ids, documents or metadata are touched, so callers that merge
+        several collections (PartitionedCollection) only pay for the payload
+        of the rows they keep, via rows_payload().
+        """
+        queries = _normalize(query_embeddings)
+        mask = self._mask(where)
+        candidate_rows = None if mask is None else np.flatnonzero(mask)
+
+        k = min(n_results, self._count if candidate_rows is None else len(candidate_rows))
+        if k == 0:
+            empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+            return [empty for _ in range(len(queries))]
+
+        hits = []
+        scores = self._scores(queries, candidate_rows)
+        for q_scores in scores:
+            top = np.argpartition(-q_scores, k - 1)[:k]
+            top = top[np.argsort(-q_scores[top], kind="stable")]
+            rows = top if candidate_rows is None else candidate_rows[top]
+            hits.append((rows, 2.0 - 2.0 * q_scores[top]))
+        return hits
+
+    def rows_payload(self, rows: List[int], include: List[str]) -> Dict[str, Any]:
+        """ids (and the included documents / metadatas / embeddings) of `rows`, in order."""
+        return self._rows_payload(rows, list(include))
+
+    def query(self, query_embeddings, n_results: int = 10, where: Dict[str, Any] = None,
+              include: List[str] = ("documents", "metadatas", "distances")) -> Dict[str, Any]:
+        include = list(include)
+        result: Dict[str, List[Any]] = {"ids": []}
+        for field in ("documents", "metadatas", "distances", "embeddings"):
+            if field in include:
+                result[field] = []
+        for rows, distances in self.query_rows(query_embeddings, n_results, where):
+            payload = self._rows_payload(rows.tolist(), include)
+            for field, values in payload.items():
+                result[field].append(values)
+            if "distances" in include:
+                result["distances"].append(distances.tolist())
+        return result
@@ -0,0 +1,263 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+###############################################################################
+# Section-partitioned chunk index
+#
+# PartitionedCollection keeps one sub-collection per chunk `section`
+# (experience, education, publication, ...) behind the same Collection API
+# ChunkedCandidateDB already uses. A `section` filter is pushed down: only
+# the matching partitions are searched, and the filter is stripped from the
+# `where` clause they see, so a selective filter is a plain ANN search over
+# a small index instead of a filtered search over the whole corpus.
+# Results from several partitions are merged by distance.
+#
+# Searching every partition for an unfiltered query costs one round trip and
+# n_results rows per partition, so a backend with per-call overhead (Chroma)
+# can also keep a `full_index` over all chunks that serves unfiltered queries
+# (on Chroma ~4-6x faster than the fan-out). It is a second copy of every
+# vector, document and metadata row, i.e. twice the index storage.
+# Partitions stay the source of truth for get()/count(); sync_full_index()
+# brings a full_index that disagrees with them (e.g. the unpartitioned
+# collection left from before partitioning) back in line.
+###############################################################################
+
+PARTITION_KEY = "section"
+
+
+def _section_values(cond: Any) -> Optional[List[str]]:
+    """Sections selected by a `section` condition, or None if it is not a plain match."""
+    if isinstance(cond, str):
+        return [cond]
+    if isinstance(cond, dict) and len(cond) == 1:
+        op, value = next(iter(cond.items()))
+        if op == "$eq":
+            return [value]
+        if op == "$in":
+            return list(value)
+    return None
+
+
+def split_partition_filter(where: Optional[Dict[str, Any]]) -> Tuple[Optional[List[str]], Optional[Dict[str, Any]]]:
+    """
+    Splits `where` into (sections, remaining where). sections is None when the
+    filter does not restrict the section, i.e. every partition must be searched.
+    Only top-level and `$and` section conditions are pushed down; anything else
+    is left in the remaining clause.
+    """
+    if not where:
+        return None, None
+    if PARTITION_KEY in where and len(where) == 1:
+        sections = _section_values(where[PARTITION_KEY])
+        if sections is not None:
+            return sections, None
+        return None, where
+    if "$and" in where and len(where) == 1:
+        sections = None
+        rest = []
+        for clause in where["$and"]:
+            clause_sections = None
+            if PARTITION_KEY in clause and len(clause) == 1:
+                clause_sections = _section_values(clause[PARTITION_KEY])
+            if clause_sections is None:
+                rest.append(clause)
+            elif sections is None:
+                sections = clause_sections
+            else:
+                sections = [s for s in sections if s in clause_sections]
+        if not rest:
+            return sections, None
+        if len(rest) == 1:
+            return sections, rest[0]
+        return sections, {"$and": rest}
+    return None, where
+
+
+class PartitionedCollection:
+    def __init__(self, make_partition: Callable[[str], Any], existing_sections: Iterable[str] = (), full_index: Any = None):
+        self._make_partition = make_partition
+        self.partitions: Dict[str, Any] = {s: make_partition(s) for s in existing_sections}
+        self.full_index = full_index
+        # Partition sizes, cached between writes (a Chroma count() is a round trip).
+        self._counts: Dict[str, int] = {}
+
+    def _partition(self, section: str):
+        partition = self.partitions.get(section)
+        if partition is None:
+            partition = self._make_partition(section)
+            self.partitions[section] = partition
+        return partition
+
+    def set_partition(self, section: str, partition: Any) -> None:
+        """Installs a ready-made sub-collection for `section` (e.g. one attached to a snapshot)."""
+        self.partitions[section] = partition
+        self._counts.pop(section, None)
+
+    def sync_full_index(self, batch_size: int = 1000) -> Tuple[int, int]:
+        """
+        Makes full_index hold exactly the partitions' chunks: ids only it has
+        are deleted and chunks it lacks are copied from their partitions (no
+        re-encoding). Skipped when the counts already agree. Returns
+        (deleted, copied).
+        """
+        if self.full_index is None or self.full_index.count() == self.count():
+            return 0, 0
+        owner: Dict[str, str] = {}
+        for section, partition in self.partitions.items():
+            for doc_id in partition.get(include=[])["ids"]:
+                owner[doc_id] = section
+        full_ids = set(self.full_index.get(include=[])["ids"])
+        stale = [doc_id for doc_id in full_ids if doc_id not in owner]
+        for start in range(0, len(stale), batch_size):
+            self.full_index.delete(ids=stale[start:start + batch_size])
+        missing: Dict[str, List[str]] = {}
+        for doc_id, section in owner.items():
+            if doc_id not in full_ids:
+                missing.setdefault(section, []).append(doc_id)
+        copied = 0
+        for section, ids in missing.items():
+            for start in range(0, len(ids), batch_size):
+                part = self.partitions[section].get(ids=ids[start:start + batch_size],
+                                                    include=["embeddings", "documents", "metadatas"])
+                self.full_index.upsert(ids=part["ids"], embeddings=np.asarray(part["embeddings"], dtype=np.float32),
+                                       documents=part["documents"], metadatas=part["metadatas"])
+                copied += len(part["ids"])
+        return len(stale), copied
+
+    def _targets(self, sections: Optional[List[str]]) -> List[str]:
+        if sections is None:
+            return list(self.partitions)
+        return [s for s in dict.fromkeys(sections) if s in self.partitions]
+
+    def _partition_count(self, section: str) -> int:
+        count = self._counts.get(section)
+        if count is None:
+            count = self.partitions[section].count()
+            self._counts[section] = count
+        return count
+
+    def count(self) -> int:
+        return sum(self._partition_count(s) for s in self.partitions)
+
+    def upsert(self, ids: List[str], embeddings, documents: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        rows_by_section: Dict[str, List[int]] = {}
+        for row, metadata in enumerate(metadatas):
+            rows_by_section.setdefault(metadata.get(PARTITION_KEY, ""), []).append(row)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        self._counts.clear()
+        if self.full_index is not None:
+            self.full_index.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+        for section, rows in rows_by_section.items():
+            self._partition(section).upsert(
+                ids=[ids[r] for r in rows],
+                embeddings=embeddings[rows],
+                documents=[documents[r] for r in rows],
+                metadatas=[metadatas[r] for r in rows]
+            )
+
+    def delete(self, ids: List[str]) -> None:
+        # Chunk ids do not name their partition, and deleting a missing id is a no-op.
+        self._counts.clear()
+        if self.full_index is not None:
+            self.full_index.delete(ids=ids)
+        for partition in self.partitions.values():
+            partition.delete(ids=ids)
+
+    def get(self, ids: List[str] = None, where: Dict[str, Any] = None,
+            include: List[str] = ("documents", "metadatas")) -> Dict[str, Any]:
+        include = list(include)
+        sections, rest = split_partition_filter(where)
+        merged: Dict[str, Any] = {"ids": []}
+        for field in ("documents", "metadatas", "embeddings"):
+            if field in include:
+                merged[field] = []
+        for section in self._targets(sections):
+            params: Dict[str, Any] = {"include": include}
+            if ids is not None:
+                params["ids"] = ids
+            if rest is not None:
+                params["where"] = rest
+            part = self.partitions[section].get(**params)
+            for field in merged:
+                values = part.get(field)
+                if values is not None:
+                    merged[field].extend(list(values))
+        if "embeddings" in merged:
+            merged["embeddings"] = np.asarray(merged["embeddings"], dtype=np.float32)
+        return merged
+
+    def query(self, query_embeddings, n_results: int = 10, where: Dict[str, Any] = None,
+              include: List[str] = ("documents", "metadatas", "distances")) -> Dict[str, Any]:
+        include = list(include)
+        if "distances" not in include:
+            include.append("distances")
+        query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+        if query_embeddings.ndim == 1:
+            query_embeddings = query_embeddings[None, :]
+        sections, rest = split_partition_filter(where)
+        if sections is None and self.full_index is not None:
+            params = {"query_embeddings": query_embeddings, "n_results": n_results, "include": include}
+            if where is not None:
+                params["where"] = where
+            return self.full_index.query(**params)
+
+        targets = [s for s in self._targets(sections) if self._partition_count(s) > 0]
+        if targets and all(hasattr(self.partitions[s], "query_rows") for s in targets):
+            return self._query_rows_merged(query_embeddings, n_results, rest, include, targets)
+
+        fields = ["ids"] + [f for f in ("documents", "metadatas", "distances") if f in include]
+        per_query: List[Dict[str, List[Any]]] = [{f: [] for f in fields} for _ in query_embeddings]
+        for section in self._targets(sections):
+            size = self._partition_count(section)
+            if size == 0:
+                continue
+            params: Dict[str, Any] = {
+                "query_embeddings": query_embeddings,
+                "n_results": min(n_results, size),
+                "include": include
+            }
+            if rest is not None:
+                params["where"] = rest
+            part = self.partitions[section].query(**params)
+            for q, acc in enumerate(per_query):
+                for field in fields:
+                    acc[field].extend(part[field][q])
+
+        result: Dict[str, Any] = {f: [] for f in fields}
+        for acc in per_query:
+            order = np.argsort(np.asarray(acc["distances"], dtype=np.float64), kind="stable")[:n_results]
+            for field in fields:
+                result[field].append([acc[field][i] for i in order])
+        return result
+
+    def _query_rows_merged(self, query_embeddings: np.ndarray, n_results: int, where: Optional[Dict[str, Any]],
+                           include: List[str], targets: List[str]) -> Dict[str, Any]:
+        """
+        Merge path for partitions that can search without building payloads
+        (NumpyCollection.query_rows): hits are merged on distance first and
+        documents / metadatas are fetched only for the n_results rows kept.
+        """
+        payload_fields = [f for f in ("documents", "metadatas") if f in include]
+        hits = {s: self.partitions[s].query_rows(query_embeddings, n_results, where) for s in targets}
+        result: Dict[str, Any] = {f: [] for f in ["ids"] + payload_fields + ["distances"]}
+        for q in range(len(query_embeddings)):
+            distances = np.concatenate([hits[s][q][1] for s in targets])
+            owners = np.concatenate([np.full(len(hits[s][q][0]), i) for i, s in enumerate(targets)])
+            rows = np.concatenate([hits[s][q][0] for s in targets])
+            # Stable on distance, so ties keep partition order as before.
+            order = np.argsort(distances.astype(np.float64), kind="stable")[:n_results]
+            slots: Dict[int, List[int]] = {}
+            for position, i in enumerate(order):
+                slots.setdefault(int(owners[i]), []).append(position)
+            merged = {f: [None] * len(order) for f in ["ids"] + payload_fields}
+            for owner, positions in slots.items():
+                part = self.partitions[targets[owner]].rows_payload(
+                    [int(rows[order[p]]) for p in positions], payload_fields)
+                for field in merged:
+                    for p, value in zip(positions, part[field]):
+                        merged[field][p] = value
+            for field, values in merged.items():
+                result[field].append(values)
+            result["distances"].append(distances[order].tolist())
+        return result
@@ -0,0 +1,120 @@
+import json
+import os
+from typing import Any, Dict, Iterator, TextIO
+
+###############################################################################
+# Incremental profile reader
+#
+# iter_profiles() yields candidate profiles one at a time from
+#   - a JSON document shaped like {"profiles": [...]} or a bare [...] list
+#   - a JSONL / NDJSON file with one profile per line
+# without loading the whole file, so ingest memory stays bounded by the
+# ingest batch rather than the size of the dump.
+###############################################################################
+
+_WHITESPACE = " \t\r\n"
+
+
+class _JsonStream:
+    """Pulls JSON tokens and values off a text file through a bounded buffer."""
+
+    def __init__(self, f: TextIO, read_size: int):
+        self._f = f
+        self._read_size = read_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        data = self._f.read(self._read_size)
+        if not data:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf) or not self._fill():
+                break
+        return self._buf[self._pos] if self._pos < len(self._buf) else ""
+
+    def expect(self, token: str) -> None:
+        found = self.peek()
+        if found != token:
+            raise ValueError(f"Unexpected JSON structure: expected {token!r}, found {found!r}")
+        self._pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A value that runs to the end of the buffer (e.g. a number) may
+            # continue in the next read.
+            if end == len(self._buf) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def array_items(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            token = self.peek()
+            self._pos += 1
+            if token == "]":
+                return
+            if token != ",":
+                raise ValueError(f"Unexpected JSON structure: expected ',' or ']', found {token!r}")
+
+
+def iter_profiles(path: str, read_size: int = 1 << 16) -> Iterator[Dict[str, Any]]:
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Could not find {path}")
+
+    with open(path, "r") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+
+        stream = _JsonStream(f, read_size)
+        first = stream.peek()
+        if first == "[":
+            yield from stream.array_items()
+            return
+        if first != "{":
+            raise ValueError("Unexpected JSON structure.")
+
+        stream.expect("{")
+        found = False
+        while stream.peek() != "}":
+            key = stream.value()
+            stream.expect(":")
+            if key == "profiles":
+                found = True
+                yield from stream.array_items()
+            else:
+                stream.value()
+            if stream.peek() == ",":
+                stream.expect(",")
+        if not found:
+            # An object without "profiles" is not a candidates dump; yielding
+            # nothing would read as an empty corpus.
+            raise ValueError("Unexpected JSON structure.")
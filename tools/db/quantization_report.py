@@ -0,0 +1,98 @@
+import json
+import sys
+from typing import Any, Dict, List
+
+import numpy as np
+
+from chunked_candidates_final import ChunkedCandidateDB, parse_subquery_for_filters
+from numpy_index import NumpyCollection
+from profile_stream import iter_profiles
+
+###############################################################################
+# Memory vs. recall of quantized chunk vectors
+#
+# Ingests candidates.json once (float32, numpy backend), copies the same
+# vectors into float16 and int8 collections, and compares each against
+# float32 on a fixed set of recruiter queries:
+#   - chunk_overlap@k:     |top-k chunks ∩ float32 top-k chunks| / k
+#   - candidate_overlap@k: same for the top-k candidates of multi_subquery_search
+#   - vector_bytes:        memory held by the stored vectors (and scales)
+#
+#   python quantization_report.py [candidates.json] [k] [--json report.json]
+###############################################################################
+
+REPORT_QUERIES = [
+    "machine learning research",
+    "industry experience in software engineering",
+    "publications in computer vision",
+    "student interested in robotics",
+    "web development with javascript",
+    "natural language processing and published papers",
+    "startup founder",
+    "biomedical engineering",
+    "distributed systems and industry experience",
+    "data science internship",
+]
+
+
+def _top_chunks(collection, query_embeddings: np.ndarray, k: int) -> List[List[str]]:
+    return collection.query(query_embeddings=query_embeddings, n_results=k, include=["distances"])["ids"]
+
+
+def _top_candidates(db: ChunkedCandidateDB, k: int) -> List[List[str]]:
+    return [[c["candidate_id"] for c in db.multi_subquery_search(q)[:k]] for q in REPORT_QUERIES]
+
+
+def _overlap(results: List[List[str]], reference: List[List[str]], k: int) -> float:
+    # Queries with no reference hits (e.g. an empty subquery intersection) are skipped.
+    scores = [len(set(r[:k]) & set(ref[:k])) / min(k, len(ref)) for r, ref in zip(results, reference) if ref]
+    return float(np.mean(scores)) if scores else 0.0
+
+
+def quantization_report(json_path: str = "candidates.json", k: int = 10) -> Dict[str, Any]:
+    # Collections are swapped under the same index_version, so cached results would be stale.
+    db = ChunkedCandidateDB(persist_directory=None, backend="numpy", partition_by_section=False,
+                            result_cache_size=0)
+    db.ingest_candidates(iter_profiles(json_path))
+    ingested = db.collection
+    stored = ingested.get(include=["documents", "metadatas", "embeddings"])
+    query_embeddings = db._encode_queries([parse_subquery_for_filters(q)[0] for q in REPORT_QUERIES])
+
+    report: Dict[str, Any] = {"chunks": ingested.count(), "k": k, "dtypes": {}}
+    reference_chunks = reference_candidates = None
+    for vector_dtype in ("float32", "float16", "int8"):
+        collection = NumpyCollection(vector_dtype=vector_dtype)
+        collection.upsert(ids=stored["ids"], embeddings=stored["embeddings"],
+                          documents=stored["documents"], metadatas=stored["metadatas"])
+        # Same documents, so the keyword index stays valid; only the vectors change.
+        db.collection = collection
+        top_chunks = _top_chunks(collection, query_embeddings, k)
+        top_candidates = _top_candidates(db, k)
+        if reference_chunks is None:
+            reference_chunks, reference_candidates = top_chunks, top_candidates
+        report["dtypes"][vector_dtype] = {
+            "vector_bytes": collection.nbytes,
+            "chunk_overlap": _overlap(top_chunks, reference_chunks, k),
+            "candidate_overlap": _overlap(top_candidates, reference_candidates, k),
+        }
+    db.collection = ingested
+    return report
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--json"]
+    json_out = sys.argv[sys.argv.index("--json") + 1] if "--json" in sys.argv else None
+    if json_out:
+        args.remove(json_out)
+    json_path = args[0] if args else "candidates.json"
+    k = int(args[1]) if len(args) > 1 else 10
+
+    report = quantization_report(json_path, k)
+    print(f"\n{report['chunks']} chunks, top-{k} overlap vs float32 over {len(REPORT_QUERIES)} queries\n")
+    print(f"{'dtype':<8} {'vector MB':>10} {'chunks@k':>9} {'candidates@k':>13}")
+    for vector_dtype, row in report["dtypes"].items():
+        print(f"{vector_dtype:<8} {row['vector_bytes'] / 1e6:>10.2f} "
+              f"{row['chunk_overlap']:>9.3f} {row['candidate_overlap']:>13.3f}")
+    if json_out:
+        with open(json_out, "w") as f:
+            json.dump(report, f, indent=2)
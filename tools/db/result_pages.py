@@ -0,0 +1,133 @@
+import base64
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+###############################################################################
+# Short-lived ranked result lists for cursor pagination
+#
+# The first page of a search stores the full ranked candidate list under a
+# random token; later pages are slices of that list, so paging never
+# re-encodes the query or touches the vector index. A cursor is the opaque
+# urlsafe-base64 of "token:offset:page_size". Lists expire ttl_seconds after
+# they were stored, and at most max_entries are kept (oldest dropped first).
+#
+# By default the lists live in this process. With `directory` set each list
+# is a JSON file <token>.json there instead (expiry by file mtime), so a
+# cursor issued by one uvicorn worker can be paged by any other worker
+# sharing that directory.
+###############################################################################
+
+_TOKEN = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def encode_cursor(token: str, offset: int, page_size: int) -> str:
+    return base64.urlsafe_b64encode(f"{token}:{offset}:{page_size}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int, int]:
+    """Returns (token, offset, page_size); raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        token, offset, page_size = raw.rsplit(":", 2)
+        offset, page_size = int(offset), int(page_size)
+    except Exception:
+        raise ValueError("Malformed cursor")
+    if offset < 0 or page_size <= 0:
+        raise ValueError("Malformed cursor")
+    return token, offset, page_size
+
+
+def slice_page(token: str, ranked: List[Any], offset: int, page_size: int) -> Tuple[List[Any], Optional[str]]:
+    """Slice [offset, offset + page_size) of `ranked` and the cursor of the next page, if any."""
+    end = offset + page_size
+    next_cursor = encode_cursor(token, end, page_size) if end < len(ranked) else None
+    return ranked[offset:end], next_cursor
+
+
+class RankedResultStore:
+    def __init__(self, ttl_seconds: float = 300.0, max_entries: int = 256, directory: str = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries: "OrderedDict[str, Tuple[float, List[Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, token: str) -> str:
+        return os.path.join(self.directory, token + ".json")
+
+    def _expire_files(self, now: float) -> None:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                # Removed by another worker meanwhile.
+                continue
+        entries.sort()
+        excess = len(entries) - self.max_entries
+        for i, (stored_at, path) in enumerate(entries):
+            if i >= excess and now - stored_at < self.ttl_seconds:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _put_file(self, token: str, ranked: List[Any]) -> None:
+        # Written under a temporary name and renamed, so a reader never sees a partial file.
+        tmp_path = self._path(token) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(ranked, f, default=float)
+        os.replace(tmp_path, self._path(token))
+        self._expire_files(time.time())
+
+    def _get_file(self, token: str) -> Optional[List[Any]]:
+        # Tokens are token_urlsafe() output; anything else (e.g. a path) cannot name a stored list.
+        if not _TOKEN.fullmatch(token):
+            return None
+        try:
+            if time.time() - os.path.getmtime(self._path(token)) >= self.ttl_seconds:
+                return None
+            with open(self._path(token)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _expire(self, now: float) -> None:
+        while self._entries:
+            token, (stored_at, _) = next(iter(self._entries.items()))
+            if now - stored_at < self.ttl_seconds:
+                break
+            del self._entries[token]
+
+    def put(self, ranked: List[Any]) -> str:
+        token = secrets.token_urlsafe(12)
+        if self.directory:
+            self._put_file(token, ranked)
+            return token
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            self._entries[token] = (now, ranked)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return token
+
+    def get(self, token: str) -> Optional[List[Any]]:
+        """The stored list, or None if it never existed or has expired."""
+        if self.directory:
+            return self._get_file(token)
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._entries.get(token)
+        return None if entry is None else entry[1]
@@ -0,0 +1,189 @@
+import argparse
+import json
+import platform
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+
+from chunked_candidates_final import ChunkedCandidateDB
+from profile_stream import iter_profiles
+
+###############################################################################
+# Search latency / recall benchmark
+#
+# Ingests candidates.json into the configuration under test and into an
+# exact reference (numpy backend, float32, no coarse pass, every chunk
+# scored), then runs a fixed set of recruiter queries through
+# multi_subquery_search with the result/embedding caches off:
+#   - latency p50/p95/p99 and sequential throughput, per query category
+#   - concurrent throughput with --threads workers
+#   - mean per-stage time (the timings dict of the search path)
+#   - recall@k: share of the reference top-k candidates found in the top-k
+# The reference ranks with the same scoring (same retrieval / fusion), so
+# recall measures what the index, quantization and truncation lose.
+#
+#   python search_benchmark.py --out before.json
+#   python search_benchmark.py --vector-dtype int8 --compare before.json
+###############################################################################
+
+BENCHMARK_QUERIES: Dict[str, List[str]] = {
+    "single": [
+        "machine learning research",
+        "web development with javascript",
+        "startup founder",
+        "biomedical engineering",
+        "computer vision and deep learning",
+        "data science internship",
+    ],
+    "single_filtered": [
+        "publications in computer vision",
+        "industry experience in software engineering",
+        "student interested in robotics",
+        "published papers on natural language processing",
+    ],
+    "multi": [
+        "machine learning and web development",
+        "robotics and startup founder",
+        "data science and biomedical engineering",
+    ],
+    "multi_filtered": [
+        "ML research and industry experience",
+        "industry experience and publications",
+        "student and machine learning",
+        "distributed systems and industry experience",
+    ],
+}
+
+
+def _percentiles(latencies_ms: List[float]) -> Dict[str, float]:
+    values = np.asarray(latencies_ms, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": int(values.size),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(values.max()),
+        "qps": float(values.size / (values.sum() / 1000.0)) if values.sum() > 0 else 0.0,
+    }
+
+
+def _recall(found: List[str], expected: List[str], k: int) -> float:
+    expected = expected[:k]
+    if not expected:
+        return 1.0
+    return len(set(found[:k]) & set(expected)) / len(expected)
+
+
+def _top_ids(db: ChunkedCandidateDB, query: str, n_results: int, k: int) -> List[str]:
+    return [c["candidate_id"] for c in db.multi_subquery_search(query, n_results, max_candidates=k)][:k]
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    common = {"persist_directory": None, "retrieval": args.retrieval, "fusion": args.fusion,
+              "query_cache_size": 0, "result_cache_size": 0}
+    db = ChunkedCandidateDB(backend=args.backend, vector_dtype=args.vector_dtype,
+                            coarse_candidates=args.coarse_candidates, **common)
+    ingest = db.ingest_candidates(iter_profiles(args.candidates))
+    reference = ChunkedCandidateDB(backend="numpy", partition_by_section=False, **common)
+    # Same chunks, same vectors: copy them over instead of encoding twice.
+    stored = db.collection.get(include=["documents", "metadatas", "embeddings"])
+    reference._store_chunks(stored["ids"], stored["documents"], np.asarray(stored["embeddings"]), stored["metadatas"])
+    all_chunks = reference.collection.count()
+
+    # Warm-up: model, keyword model, masks and (for two-stage) the candidate index.
+    for queries in BENCHMARK_QUERIES.values():
+        for query in queries:
+            db.multi_subquery_search(query, args.n_results, max_candidates=args.k)
+
+    report: Dict[str, Any] = {
+        "config": {
+            "backend": args.backend, "vector_dtype": args.vector_dtype, "retrieval": args.retrieval,
+            "fusion": args.fusion, "coarse_candidates": args.coarse_candidates, "n_results": args.n_results,
+            "k": args.k, "repeats": args.repeats, "threads": args.threads,
+        },
+        "environment": {"python": platform.python_version(), "machine": platform.machine()},
+        "corpus": {"profiles": ingest["profiles"], "chunks": all_chunks},
+        "categories": {},
+    }
+
+    all_latencies: List[float] = []
+    all_recalls: List[float] = []
+    stage_totals: Dict[str, float] = {}
+    for category, queries in BENCHMARK_QUERIES.items():
+        latencies: List[float] = []
+        recalls: List[float] = []
+        for query in queries:
+            expected = _top_ids(reference, query, all_chunks, args.k)
+            for _ in range(args.repeats):
+                timings: Dict[str, float] = {}
+                started = time.perf_counter()
+                results = db.multi_subquery_search(query, args.n_results, timings, max_candidates=args.k)
+                latencies.append((time.perf_counter() - started) * 1000.0)
+                for stage, ms in timings.items():
+                    stage_totals[stage] = stage_totals.get(stage, 0.0) + ms
+            recalls.append(_recall([c["candidate_id"] for c in results], expected, args.k))
+        report["categories"][category] = {**_percentiles(latencies), f"recall@{args.k}": float(np.mean(recalls))}
+        all_latencies.extend(latencies)
+        all_recalls.extend(recalls)
+
+    report["overall"] = {**_percentiles(all_latencies), f"recall@{args.k}": float(np.mean(all_recalls))}
+    report["stages_mean_ms"] = {stage: total / len(all_latencies) for stage, total in stage_totals.items()}
+
+    if args.threads > 1:
+        workload = [q for queries in BENCHMARK_QUERIES.values() for q in queries] * args.repeats
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            list(pool.map(lambda q: db.multi_subquery_search(q, args.n_results, max_candidates=args.k), workload))
+        elapsed = time.perf_counter() - started
+        report["concurrent"] = {"threads": args.threads, "queries": len(workload), "qps": len(workload) / elapsed}
+    return report
+
+
+def print_report(report: Dict[str, Any], previous: Dict[str, Any] = None) -> None:
+    k = report["config"]["k"]
+    print(f"\n{report['corpus']['profiles']} profiles, {report['corpus']['chunks']} chunks, "
+          f"config: {json.dumps(report['config'])}\n")
+    print(f"{'category':<16} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'qps':>8} {'recall@' + str(k):>10}")
+    rows = list(report["categories"].items()) + [("overall", report["overall"])]
+    for name, row in rows:
+        line = (f"{name:<16} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+                f"{row['qps']:>8.1f} {row[f'recall@{k}']:>10.3f}")
+        before = (previous or {}).get("categories", {}).get(name) if name != "overall" else (previous or {}).get("overall")
+        if before:
+            line += (f"   (p50 {row['p50_ms'] - before['p50_ms']:+.2f} ms, "
+                     f"recall {row[f'recall@{k}'] - before.get(f'recall@{k}', 0.0):+.3f})")
+        print(line)
+    print("\nmean ms per stage: " + ", ".join(f"{s}={ms:.2f}" for s, ms in report["stages_mean_ms"].items()))
+    if "concurrent" in report:
+        print(f"concurrent: {report['concurrent']['qps']:.1f} qps with {report['concurrent']['threads']} threads")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search latency and recall benchmark")
+    parser.add_argument("--candidates", default="candidates.json")
+    parser.add_argument("--backend", default="numpy", choices=["numpy", "chroma"])
+    parser.add_argument("--vector-dtype", default="float32", choices=["float32", "float16", "int8"])
+    parser.add_argument("--retrieval", default="hybrid", choices=["hybrid", "dense"])
+    parser.add_argument("--fusion", default="weighted", choices=["weighted", "rrf"])
+    parser.add_argument("--coarse-candidates", type=int, default=0)
+    parser.add_argument("--n-results", type=int, default=400)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", help="JSON report of an earlier run to diff against")
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_report(report, previous)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+
+import numpy as np
+
+###############################################################################
+# Search latency spans
+#
+# The search path records per-stage wall times (ms) into a plain dict
+# ("parse", "encode", "tfidf", "dense", "bm25", "fusion", "aggregate",
+# "format", ...; see ChunkedCandidateDB._run_subqueries). This module turns
+# such a dict into a Server-Timing header and keeps the last `window`
+# samples of every stage in StageHistograms, which reports percentiles and
+# cumulative bucket counts (le_X: samples <= X ms, Prometheus-style, so
+# le_inf is the sample count) on demand.
+###############################################################################
+
+# Upper bucket bounds (ms) reported by StageHistograms.snapshot().
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def add_timing(timings: Dict[str, float], stage: str, started: float) -> None:
+    """Adds the ms elapsed since `started` (a time.perf_counter() value) to timings[stage]."""
+    timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - started) * 1000.0
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Server-Timing header value, e.g. 'encode;dur=4.1, dense;dur=12.0'."""
+    return ", ".join(f"{stage};dur={ms:.1f}" for stage, ms in timings.items())
+
+
+class StageHistograms:
+    def __init__(self, window: int = 2048):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, timings: Dict[str, float]) -> None:
+        with self._lock:
+            for stage, ms in timings.items():
+                samples = self._samples.get(stage)
+                if samples is None:
+                    samples = deque(maxlen=self.window)
+                    self._samples[stage] = samples
+                samples.append(ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """Per stage over the rolling window: count, mean/p50/p95/p99/max (ms) and cumulative bucket counts."""
+        with self._lock:
+            samples = {stage: np.fromiter(values, dtype=np.float64) for stage, values in self._samples.items()}
+        report: Dict[str, Dict[str, object]] = {}
+        for stage, values in samples.items():
+            if values.size == 0:
+                continue
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            # Cumulative: samples <= each bound.
+            counts: List[int] = np.searchsorted(np.sort(values), BUCKETS_MS, side="right").tolist()
+            report[stage] = {
+                "count": int(values.size),
+                "mean_ms": float(values.mean()),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "max_ms": float(values.max()),
+                "buckets": {
+                    **{f"le_{bound}": count for bound, count in zip(BUCKETS_MS, counts)},
+                    "le_inf": int(values.size)
+                },
+            }
+        return report
@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import random
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from profile_stream import iter_profiles
+
+###############################################################################
+# Synthetic candidate profiles
+#
+# Generates profiles with the same shape as candidates.json (personal_info,
+# education, experience, projects, publications, research, awards, skills)
+# so ingest can be measured at sizes we do not have real data for. Whether a
+# profile has a section, and how many entries it has, are drawn from the
+# section statistics of a real dump: measure_section_stats() reads them
+# from candidates.json (or any profile file) when the generator starts, and
+# SECTION_STATS holds the values measured from candidates.json (419
+# profiles) for when no dump is at hand. The text is assembled from small
+# vocabularies, so every profile is distinct but the corpus is not
+# realistic for relevance work. Profiles are generated lazily and are
+# reproducible for a given seed and statistics.
+#
+#   python synthetic_profiles.py 100000 synthetic_100k.jsonl --stats-from candidates.json
+###############################################################################
+
+SECTIONS = ("education", "experience", "projects", "publications", "research", "awards", "skills")
+
+# section -> (share of profiles that have it, {entries: profiles with that many}),
+# measured from candidates.json.
+SectionStats = Dict[str, Tuple[float, Dict[int, int]]]
+SECTION_STATS: SectionStats = {
+    "education": (0.542, {1: 136, 2: 64, 3: 23, 4: 3, 6: 1}),
+    "experience": (0.496, {1: 93, 2: 58, 3: 32, 4: 10, 5: 8, 6: 2, 7: 2, 8: 2, 11: 1}),
+    "projects": (0.549, {1: 142, 2: 69, 3: 11, 4: 2, 5: 2, 6: 1, 7: 2, 11: 1}),
+    "publications": (0.248, {1: 77, 2: 21, 3: 2, 4: 2, 5: 1, 11: 1}),
+    "research": (0.334, {1: 97, 2: 24, 3: 11, 4: 5, 5: 1, 6: 2}),
+    "awards": (0.430, {1: 86, 2: 62, 3: 13, 4: 7, 5: 4, 6: 3, 7: 1, 8: 1, 9: 1, 10: 1, 14: 1}),
+    "skills": (0.582, {1: 4, 2: 7, 3: 27, 4: 29, 5: 64, 6: 35, 7: 25, 8: 21, 9: 8, 10: 14, 11: 4,
+                       12: 2, 13: 1, 15: 1, 16: 1, 25: 1}),
+}
+
+FIRST_NAMES = [
+    "Alex", "Priya", "Jordan", "Wei", "Maria", "Samuel", "Aisha", "Diego", "Hannah", "Kenji",
+    "Fatima", "Lucas", "Chloe", "Omar", "Elena", "Ravi", "Grace", "Mateo", "Nora", "Tariq",
+]
+LAST_NAMES = [
+    "Chen", "Patel", "Garcia", "Kim", "Nguyen", "Smith", "Okafor", "Rossi", "Müller", "Silva",
+    "Johnson", "Kowalski", "Haddad", "Tanaka", "Lopez", "Ivanova", "Brown", "Singh", "Cohen", "Ali",
+]
+LOCATIONS = [
+    "San Francisco, CA", "New York, NY", "Seattle, WA", "Austin, TX", "Boston, MA", "Toronto, Canada",
+    "London, United Kingdom", "Berlin, Germany", "Bangalore, India", "Singapore", "Chicago, IL", "Remote",
+]
+UNIVERSITIES = [
+    "Stanford University", "MIT", "University of California, Berkeley", "Carnegie Mellon University",
+    "University of Toronto", "Georgia Institute of Technology", "University of Michigan",
+    "ETH Zurich", "University of Washington", "Harvard University", "IIT Bombay", "University of Waterloo",
+]
+DEGREES = ["BS", "BA", "MS", "MEng", "PhD", "MBA"]
+FIELDS = [
+    "Computer Science", "Electrical Engineering", "Mathematics", "Statistics", "Bioengineering",
+    "Mechanical Engineering", "Physics", "Economics", "Data Science", "Cognitive Science",
+]
+COMPANIES = [
+    "Google", "Meta", "Stripe", "Palantir", "OpenAI", "Amazon", "Microsoft", "Databricks", "Airbnb",
+    "Nvidia", "Figma", "Snowflake", "a seed-stage startup", "Goldman Sachs", "Tesla", "Apple",
+]
+TITLES = [
+    "Software Engineer", "Machine Learning Engineer", "Research Scientist", "Data Scientist",
+    "Product Manager", "Founder & CEO", "Backend Engineer", "Software Engineering Intern",
+    "Research Assistant", "Quantitative Analyst", "Frontend Engineer", "Robotics Engineer",
+]
+TOPICS = [
+    "machine learning", "computer vision", "natural language processing", "distributed systems",
+    "reinforcement learning", "robotics", "web development", "databases", "computational biology",
+    "recommender systems", "compilers", "security", "large language models", "data infrastructure",
+    "medical imaging", "autonomous driving", "graph neural networks", "fintech",
+]
+VERBS = ["Built", "Designed", "Led", "Developed", "Shipped", "Scaled", "Prototyped", "Maintained", "Optimized"]
+ARTIFACTS = [
+    "a real-time pipeline", "an internal platform", "a ranking model", "a mobile app", "a data warehouse",
+    "a search service", "an evaluation framework", "a training cluster", "a web dashboard", "an API gateway",
+]
+SKILLS = [
+    "Python", "C++", "Java", "TypeScript", "Go", "Rust", "SQL", "PyTorch", "TensorFlow", "React",
+    "Kubernetes", "AWS", "Docker", "Spark", "PostgreSQL", "Next.js", "CUDA", "scikit-learn", "Redis", "GraphQL",
+]
+VENUES = ["NeurIPS", "ICML", "CVPR", "ACL", "ICLR", "KDD", "SIGMOD", "Nature Methods", "IEEE Transactions on Robotics"]
+AWARDS = [
+    "Dean's List", "Best Paper Award", "Hackathon Winner", "National Merit Scholar", "Graduate Fellowship",
+    "Outstanding TA Award", "Olympiad Medalist", "Innovation Award", "Employee of the Quarter",
+]
+ORGANIZATIONS = ["ACM", "IEEE", "the university", "Major League Hacking", "the National Science Foundation", "the department"]
+
+
+def measure_section_stats(path: str) -> SectionStats:
+    """Per-section presence share and entry-count histogram of the profiles in `path` (any iter_profiles format)."""
+    profiles = 0
+    histograms: Dict[str, Dict[int, int]] = {section: {} for section in SECTIONS}
+    for profile in iter_profiles(path):
+        if not isinstance(profile, dict):
+            continue
+        profiles += 1
+        for section in SECTIONS:
+            entries = profile.get(section)
+            if isinstance(entries, list) and entries:
+                histograms[section][len(entries)] = histograms[section].get(len(entries), 0) + 1
+    if profiles == 0:
+        raise ValueError(f"No profiles in {path}")
+    return {section: (sum(counts.values()) / profiles, counts) for section, counts in histograms.items()}
+
+
+def load_section_stats(path: Optional[str]) -> SectionStats:
+    """measure_section_stats(path) if the file exists, otherwise the built-in SECTION_STATS."""
+    if path and os.path.exists(path):
+        return measure_section_stats(path)
+    return SECTION_STATS
+
+
+def _count(rng: random.Random, stats: SectionStats, section: str) -> int:
+    rate, counts = stats[section]
+    if not counts or rng.random() >= rate:
+        return 0
+    return rng.choices(list(counts), weights=list(counts.values()))[0]
+
+
+def _sentence(rng: random.Random, topic: str) -> str:
+    return f"{rng.choice(VERBS)} {rng.choice(ARTIFACTS)} for {topic} using {rng.choice(SKILLS)} and {rng.choice(SKILLS)}."
+
+
+def generate_profile(index: int, rng: random.Random, stats: SectionStats = SECTION_STATS) -> Dict[str, Any]:
+    """One synthetic profile; `index` makes the id, name and contact details unique."""
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    name = f"{first} {last} {index}"
+    focus = rng.sample(TOPICS, 3)
+    year = rng.randint(2005, 2025)
+    profile: Dict[str, Any] = {
+        "id": f"synthetic-{index:07d}",
+        "personal_info": {
+            "name": name,
+            "email": f"{first.lower()}.{last.lower()}{index}@example.com",
+            "phone": f"+1{rng.randint(2000000000, 9999999999)}",
+            "location": rng.choice(LOCATIONS),
+        }
+    }
+    if rng.random() < 0.3:
+        profile["personal_info"]["university"] = rng.choice(UNIVERSITIES)
+
+    education = []
+    for i in range(_count(rng, stats, "education")):
+        start = year - 4 * (i + 1)
+        education.append({
+            "institution": rng.choice(UNIVERSITIES),
+            "degree": f"{rng.choice(DEGREES)} in {rng.choice(FIELDS)}",
+            "year": f"{start} - {start + 4}",
+        })
+    if education:
+        profile["education"] = education
+
+    experience = []
+    for i in range(_count(rng, stats, "experience")):
+        start = year - 2 * i
+        experience.append({
+            "title": rng.choice(TITLES),
+            "company": rng.choice(COMPANIES),
+            "duration": f"{start} - {'Present' if i == 0 else start + 2}",
+            "description": " ".join(_sentence(rng, rng.choice(focus)) for _ in range(rng.randint(1, 3))),
+        })
+    if experience:
+        profile["experience"] = experience
+
+    projects = []
+    for _ in range(_count(rng, stats, "projects")):
+        topic = rng.choice(focus)
+        projects.append({
+            "name": f"{topic.title().replace(' ', '')}-{rng.randint(1, 999)}",
+            "description": _sentence(rng, topic),
+            "summary": f"Open-source work on {topic}.",
+            "technologies": rng.sample(SKILLS, 3),
+        })
+    if projects:
+        profile["projects"] = projects
+
+    publications = []
+    for _ in range(_count(rng, stats, "publications")):
+        topic = rng.choice(focus)
+        publications.append({
+            "title": f"{rng.choice(['Scalable', 'Efficient', 'Robust', 'Learning'])} {topic.title()} {rng.randint(1, 9999)}",
+            "authors": f"{name}, {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "journal": rng.choice(VENUES),
+            "year": rng.randint(year - 8, year),
+            "summary": f"We study {topic} and {rng.choice(TOPICS)}. {_sentence(rng, topic)}",
+        })
+    if publications:
+        profile["publications"] = publications
+
+    research = []
+    for _ in range(_count(rng, stats, "research")):
+        topic = rng.choice(focus)
+        research.append({
+            "title": f"Research on {topic}",
+            "summary": _sentence(rng, topic),
+            "institution": rng.choice(UNIVERSITIES),
+        })
+    if research:
+        profile["research"] = research
+
+    awards = []
+    for _ in range(_count(rng, stats, "awards")):
+        awards.append({
+            "name": rng.choice(AWARDS),
+            "year": rng.randint(year - 10, year),
+            "description": f"Awarded by {rng.choice(ORGANIZATIONS)} for work in {rng.choice(focus)}.",
+        })
+    if awards:
+        profile["awards"] = awards
+
+    n_skills = _count(rng, stats, "skills")
+    if n_skills:
+        profile["skills"] = rng.sample(SKILLS, min(n_skills, len(SKILLS)))
+    return profile
+
+
+def iter_synthetic_profiles(count: int, seed: int = 0, start: int = 0,
+                            stats: SectionStats = SECTION_STATS) -> Iterator[Dict[str, Any]]:
+    """Yields `count` profiles (indices start .. start + count - 1) without holding them in memory."""
+    rng = random.Random(seed)
+    for index in range(start, start + count):
+        yield generate_profile(index, rng, stats)
+
+
+def write_profiles(path: str, count: int, seed: int = 0, stats: SectionStats = SECTION_STATS) -> int:
+    """
+    Writes `count` profiles to `path`: one per line for .jsonl / .ndjson,
+    otherwise a {"profiles": [...]} document like candidates.json. Both are
+    read back incrementally by profile_stream.iter_profiles().
+    """
+    lines = path.endswith((".jsonl", ".ndjson"))
+    with open(path, "w") as f:
+        if not lines:
+            f.write('{"profiles": [\n')
+        for i, profile in enumerate(iter_synthetic_profiles(count, seed, stats=stats)):
+            if lines:
+                f.write(json.dumps(profile) + "\n")
+            else:
+                f.write((",\n" if i else "") + json.dumps(profile))
+        if not lines:
+            f.write("\n]}\n")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic candidate profiles")
+    parser.add_argument("count", type=int)
+    parser.add_argument("path", help=".jsonl/.ndjson for one profile per line, otherwise a candidates.json-style document")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stats-from", default="candidates.json",
+                        help="profile file to take section rates and entry counts from (built-in stats if missing)")
+    args = parser.parse_args()
+    write_profiles(args.path, args.count, args.seed, load_section_stats(args.stats_from))
+    print(f"Wrote {args.count} synthetic profiles to {args.path}")